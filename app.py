@@ -1,12 +1,31 @@
 import streamlit as st
 import pandas as pd
 import io
+import os
+import time
 from datetime import date, datetime
 
 from config_loader import load_config, load_excel_template_columns
-from file_processing import load_and_process_files
-from editor_utils import apply_bulk_value, generate_time_windows, fill_temporal_columns
+from file_processing import process_files, snapshot_upload, store_processed
+from jobs import JobRunner
+from editor_utils import (
+    apply_bulk_value, undo_bulk_value, build_row_mask, generate_time_windows, fill_temporal_columns,
+    TEMPORAL_COLUMNS,
+)
 from visualizations import render_map
+from planning import plan_gateways, coverage_summary
+from project_store import list_projects, save_project, load_project, project_dir, project_exists
+from editor_window import FILTER_COLUMNS, get_window_index, merge_page_edits
+from export_utils import (
+    XLSX_MIME, PARTITION_KEYS, build_export_frame, to_xlsx_bytes, export_partitioned_zip,
+    row_fingerprints, export_delta_zip,
+)
+from reports import (
+    DOCX_MIME, save_geoposition_map, build_axes, report_context, render_report_docx,
+    report_frame, commune_keys, generate_commune_reports_zip,
+)
+from signals import signal_config
+from validation import compile_rules, validate, revalidate, changed_cells, row_issues, missing_required
 
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
@@ -22,16 +41,44 @@ if "edited_df" not in st.session_state:
     st.session_state.edited_df = pd.DataFrame()
 if "latest_edited" not in st.session_state:
     st.session_state.latest_edited = pd.DataFrame()
+if "bulk_undo" not in st.session_state:
+    st.session_state.bulk_undo = []
+if "dirty_cols" not in st.session_state:
+    st.session_state.dirty_cols = set()
 
 # Cargar configuración
 config = load_config()
 template_cols = load_excel_template_columns(config.excel_template_path)
+rules = compile_rules(config)
+ISSUES_COL = "⚠️ Issues"
+
+
+@st.cache_resource
+def get_job_runner():
+    # Compartido por todas las sesiones: los trabajos sobreviven a recargas del navegador
+    return JobRunner()
+
+
+runner = get_job_runner()
+
+
+def mark_dirty(columns):
+    # Columnas de edited_df pendientes del próximo autoguardado
+    st.session_state.dirty_cols = st.session_state.get("dirty_cols", set()) | set(columns)
+
+
+def commit_export_baseline(fingerprints, exported_at):
+    # Callback de descarga: la base de la exportación incremental solo avanza al descargar
+    st.session_state.export_fp = fingerprints
+    st.session_state.export_fp_at = exported_at
+    st.session_state.export_fp_dirty = True
+
 
 # --- NUEVO: cargar columnas visibles desde config.ini ---
 import configparser
 cfg = configparser.ConfigParser()
 cfg.optionxform = str
-cfg.read("config.ini")
+cfg.read("config.ini", encoding="utf-8")
 visible_cols = []
 if cfg.has_section("VISIBLE_COLUMNS"):
     visible_cols = [c.strip() for c in cfg.get("VISIBLE_COLUMNS", "columns").split(",") if c]
@@ -45,6 +92,31 @@ tab1, tab2 = st.tabs(["Work Order Management", "Report generator"])
 # TAB 1
 with tab1:
     if not st.session_state.processed:
+        # --- Trabajo de ingesta en segundo plano (se recupera con ?job=<id>) ---
+        job_id = st.session_state.get("ingest_job") or st.query_params.get("job")
+        job = runner.get(job_id) if job_id else None
+        if job is not None:
+            if job.running:
+                st.write(f"⚙️ {job.stage or 'Starting'}…")
+                st.progress(job.fraction, text=f"{job.done}/{job.total} {job.message}")
+                if st.button("✖️ Cancel"):
+                    job.cancel()
+                time.sleep(0.5)
+                st.rerun()
+
+            runner.discard(job.id)
+            st.session_state.pop("ingest_job", None)
+            st.query_params.pop("job", None)
+            if job.status == "done":
+                for msg in job.result["messages"]:
+                    st.toast(msg)
+                store_processed(job.result)
+                st.rerun()
+            elif job.status == "failed":
+                st.error(job.error)
+            else:
+                st.warning("Processing cancelled.")
+
         col_geo, col_cov = st.columns(2)
         with col_geo:
             geo_files = st.file_uploader(
@@ -57,8 +129,36 @@ with tab1:
 
         procesar = st.button("⚙️ Process files")
 
+        # --- Reabrir un proyecto guardado (sin volver a procesar ficheros) ---
+        projects = list_projects(config.base_save_path)
+        if projects:
+            col_proj, col_open = st.columns([4, 1])
+            with col_proj:
+                proj_sel = st.selectbox("📂 Saved projects", projects)
+            with col_open:
+                st.write("")
+                abrir = st.button("Open project")
+            if abrir and proj_sel:
+                frames, meta = load_project(config.base_save_path, proj_sel)
+                for key, frame in frames.items():
+                    st.session_state[key] = frame
+                st.session_state.latest_edited = st.session_state.edited_df.copy()
+                st.session_state.source_files = meta.get("source_files", [])
+                st.session_state.export_fp_at = meta.get("last_export_at")
+                st.session_state.project_name = proj_sel
+                st.session_state.project_saved_as = project_dir(config.base_save_path, proj_sel)
+                st.session_state.dirty_cols = set()
+                st.session_state.pop("validation_errors", None)
+                st.session_state.processed = True
+                st.rerun()
+
         if procesar and geo_files:
-            load_and_process_files(geo_files, cov_file, config)
+            job = runner.submit(
+                "ingest", process_files,
+                [snapshot_upload(f) for f in geo_files], snapshot_upload(cov_file), config,
+            )
+            st.session_state.ingest_job = job.id
+            st.query_params["job"] = job.id
             st.rerun()
         else:
             st.stop()
@@ -87,22 +187,37 @@ with tab1:
 
     # --- Filtrar columnas visibles solo para la tabla ---
     if visible_cols:
-        keep = ["ID point"] + [c for c in visible_cols if c in disp.columns]
-        disp_view = st.session_state.edited_df[keep].copy()
+        view_cols = ["ID point"] + [c for c in visible_cols if c in disp.columns]
     else:
-        disp_view = st.session_state.edited_df.copy()
+        view_cols = list(st.session_state.edited_df.columns)
 
     col_left, col_spacer, col_right = st.columns([3, 12, 2])
 
     with col_left:
         if st.button("🔁 Reload files"):
-            for key in ["processed", "df", "geo_df", "cov_df", "edited_df", "latest_edited"]:
+            for key in ["processed", "df", "geo_df", "cov_df", "edited_df", "latest_edited",
+                        "project_name", "source_files", "bulk_undo", "map_selection_ids",
+                        "validation_errors", "gateway_plan", "export_fp", "export_fp_at",
+                        "project_saved_as", "project_overwrite", "dirty_cols", "export_fp_dirty"]:
                 st.session_state.pop(key, None)
             st.rerun()
 
     with col_right:
-        if st.button("💾 Save changes"):
+        guardar = st.button("💾 Save changes")
+        if guardar:
             st.session_state.edited_df = st.session_state.latest_edited.copy()
+            mark_dirty(st.session_state.edited_df.columns)
+
+    col_pname, col_autosave, col_spacer = st.columns([4, 2, 9])
+    with col_pname:
+        project_name = st.text_input(
+            "🗂️ Project name",
+            key="project_name",
+            placeholder="e.g. Dakar - Pikine",
+        ).strip()
+    with col_autosave:
+        st.write("")
+        autosave = st.checkbox("Autosave project", value=True)
 
     # --- ALIAS para nombres cortos solo en la web ---
     column_aliases = {
@@ -125,33 +240,177 @@ with tab1:
         "Name - Bookable Resource Booking": "Resource",
     }
 
-    # Editor: solo columnas visibles, con alias en la web
-    edited = st.data_editor(
-        disp_view,
-        num_rows="dynamic",
-        use_container_width=True,
-        key="editor",
-        column_config={
-            **{
-                long: st.column_config.Column(label=short)
-                for long, short in column_aliases.items()
-                if long in disp_view.columns
-            },
-            "Latitude - Functional Location": st.column_config.NumberColumn(
-                format="%.15f", label="Lat"
-            ),
-            "Longitude - Functional Location": st.column_config.NumberColumn(
-                format="%.15f", label="Lon"
-            ),
+    editor_columns = {
+        **{
+            long: st.column_config.Column(label=short)
+            for long, short in column_aliases.items()
+            if long in view_cols
         },
+        "Latitude - Functional Location": st.column_config.NumberColumn(
+            format="%.15f", label="Lat"
+        ),
+        "Longitude - Functional Location": st.column_config.NumberColumn(
+            format="%.15f", label="Lon"
+        ),
+        ISSUES_COL: st.column_config.TextColumn(ISSUES_COL, disabled=True),
+    }
+
+    # --- Máscara de errores de validación (se mantiene de forma incremental) ---
+    errors = st.session_state.get("validation_errors")
+    if errors is None or not errors.index.equals(st.session_state.edited_df.index):
+        errors = validate(st.session_state.edited_df, rules)
+
+    windowed = st.toggle(
+        "🪟 Windowed editor",
+        value=len(st.session_state.edited_df) > config.editor_window_threshold,
+        help="Only one page of rows is sent to the browser; filter and sort run on the server.",
     )
 
-    # --- Merge cambios visibles hacia el DataFrame completo ---
-    for col in disp_view.columns:
-        st.session_state.edited_df[col] = edited[col]
+    if windowed:
+        # --- Editor por páginas: filtros/orden en servidor, merge por 'ID point' ---
+        win_idx = get_window_index(st.session_state, st.session_state.edited_df, signal_config(config))
+
+        filter_cols = st.columns(len(FILTER_COLUMNS) + 2)
+        filters = {}
+        for fcol, name in zip(filter_cols, FILTER_COLUMNS):
+            with fcol:
+                filters[name] = st.multiselect(name, win_idx.options(name), key=f"win_filter_{name}")
+        with filter_cols[-2]:
+            sort_by = st.selectbox("Sort by", ["ID point"] + list(FILTER_COLUMNS), key="win_sort")
+        with filter_cols[-1]:
+            ascending = st.selectbox("Order", ["Ascending", "Descending"], key="win_order") == "Ascending"
+
+        positions = win_idx.select(filters, sort_by, ascending)
+        page_size = config.editor_page_size
+        n_pages = max(1, -(-len(positions) // page_size))
+        col_page, col_info = st.columns([2, 13])
+        if st.session_state.get("win_page", 1) > n_pages:
+            st.session_state.win_page = n_pages
+        with col_page:
+            page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key="win_page")
+        with col_info:
+            st.write("")
+            st.caption(f"{len(positions)} of {len(st.session_state.edited_df)} rows match · page {page}/{n_pages}")
+
+        page_pos = positions[(page - 1) * page_size: page * page_size]
+        disp_view = st.session_state.edited_df.iloc[page_pos][view_cols].copy()
+        disp_view.insert(1, ISSUES_COL, row_issues(errors, disp_view.index, column_aliases))
+
+        # La clave depende de la ventana: las ediciones del widget no se reaplican a otras filas
+        window_key = repr((
+            sorted((k, tuple(v)) for k, v in filters.items()), sort_by, ascending, page,
+            st.session_state.get("win_rev", 0),
+        ))
+        edited = st.data_editor(
+            disp_view,
+            num_rows="fixed",
+            use_container_width=True,
+            hide_index=True,
+            key=f"editor_win_{hash(window_key)}",
+            column_config=editor_columns,
+        )
 
-    # Copia de seguridad completa
-    st.session_state.latest_edited = st.session_state.edited_df.copy()
+        changes = merge_page_edits(st.session_state.edited_df, disp_view, edited, win_idx)
+        win_idx.invalidate(changes)
+        if changes.keys() & set(FILTER_COLUMNS.values()):
+            # Las filas de la ventana pueden cambiar: nuevo widget en la siguiente ejecución
+            st.session_state.win_rev = st.session_state.get("win_rev", 0) + 1
+    else:
+        st.session_state.pop("window_index", None)
+        if st.session_state.latest_edited is st.session_state.edited_df:
+            # Se sale del modo ventanas: instantánea para detectar los cambios del editor
+            st.session_state.latest_edited = st.session_state.edited_df.copy()
+        disp_view = st.session_state.edited_df[view_cols].copy()
+        disp_view.insert(1, ISSUES_COL, row_issues(errors, disp_view.index, column_aliases))
+
+        # Editor: solo columnas visibles, con alias en la web
+        edited = st.data_editor(
+            disp_view,
+            num_rows="dynamic",
+            use_container_width=True,
+            key="editor",
+            column_config=editor_columns,
+        )
+
+        # --- Merge cambios visibles hacia el DataFrame completo ---
+        for col in view_cols:
+            st.session_state.edited_df[col] = edited[col]
+        changes = changed_cells(st.session_state.latest_edited, st.session_state.edited_df, view_cols)
+
+    # Revalidar solo las filas/columnas modificadas
+    errors = revalidate(errors, st.session_state.edited_df, rules, changes)
+    st.session_state.validation_errors = errors
+    issues_stale = bool(changes) and not row_issues(
+        errors, disp_view.index, column_aliases
+    ).equals(disp_view[ISSUES_COL])
+
+    bad_cols = errors.sum()
+    bad_cols = bad_cols[bad_cols > 0]
+    if len(bad_cols):
+        st.caption(
+            f"⚠️ {int(errors.any(axis=1).sum())} rows with issues — "
+            + ", ".join(f"{column_aliases.get(c, c)} ({n})" for c, n in bad_cols.items())
+        )
+
+    # Copia de seguridad completa; en modo ventanas edited_df se edita en sitio
+    # (merge_page_edits) y basta con la referencia: sin copia O(n) por rerun
+    if windowed:
+        st.session_state.latest_edited = st.session_state.edited_df
+    else:
+        st.session_state.latest_edited = st.session_state.edited_df.copy()
+
+    # Autoguardado del proyecto (solo se reescriben las columnas modificadas)
+    mark_dirty(st.session_state.edited_df.columns if changes is None else changes)
+    if project_name and (autosave or guardar):
+        meta = {
+            "source_files": st.session_state.get("source_files", []),
+            "last_export_at": st.session_state.get("export_fp_at"),
+            "rows": int(len(st.session_state.edited_df)),
+        }
+        target = project_dir(config.base_save_path, project_name)
+        saved = True
+        if st.session_state.get("project_saved_as") != target:
+            # Otro proyecto (o un nombre que se sanea a la misma carpeta) ya está guardado ahí
+            if (project_exists(config.base_save_path, project_name)
+                    and st.session_state.get("project_overwrite") != target):
+                saved = False
+                st.warning(
+                    f"A saved project already uses the folder '{os.path.basename(target)}'. "
+                    "Open it from the start screen or choose another name; autosave is paused."
+                )
+                if st.button("Overwrite saved project"):
+                    st.session_state.project_overwrite = target
+                    st.rerun()
+            else:
+                # Primer guardado con este nombre: df, geo_df y cov_df no cambian tras la ingesta
+                save_project(
+                    config.base_save_path,
+                    project_name,
+                    {
+                        "df": st.session_state.df,
+                        "geo_df": st.session_state.get("geo_df"),
+                        "cov_df": st.session_state.get("cov_df"),
+                        "edited_df": st.session_state.edited_df,
+                        "export_fp": st.session_state.get("export_fp"),
+                    },
+                    meta=meta,
+                )
+                st.session_state.project_saved_as = target
+        elif st.session_state.dirty_cols or st.session_state.get("export_fp_dirty"):
+            frames = {"edited_df": st.session_state.edited_df}
+            if st.session_state.get("export_fp_dirty"):
+                frames["export_fp"] = st.session_state.get("export_fp")
+            save_project(
+                config.base_save_path, project_name, frames, meta=meta,
+                dirty={"edited_df": st.session_state.dirty_cols},
+            )
+        if saved:
+            st.session_state.dirty_cols = set()
+            st.session_state.export_fp_dirty = False
+
+    # La columna de incidencias mostrada quedó desfasada tras la edición
+    if issues_stale:
+        st.rerun()
 
     # (resto de la lógica de TAB 1 sin cambios: validaciones, autofill, download Excel, etc.)
     # ------------------------------------------------------------------
@@ -162,14 +421,14 @@ with tab1:
 
     with col1:
         st.write("➕ Add data")
-        editable_cols = [c for c in edited.columns if c not in config.protected_columns]
+        editable_cols = [c for c in view_cols if c not in config.protected_columns]
         col_sel = st.selectbox("Column", editable_cols)
 
         val = ""
         if col_sel == "Name - Child Functional Location":
             parents = (
-                edited["Name - Parent Functional Location"].dropna().unique().tolist()
-                if "Name - Parent Functional Location" in edited.columns
+                st.session_state.edited_df["Name - Parent Functional Location"].dropna().unique().tolist()
+                if "Name - Parent Functional Location" in st.session_state.edited_df.columns
                 else []
             )
 
@@ -183,10 +442,60 @@ with tab1:
         else:
             val = st.text_input("Valor")
 
-        if st.button("📌 Apply value"):
-            new_df = apply_bulk_value(st.session_state.latest_edited.copy(), col_sel, val)
+        # --- Alcance: todas las filas, filas que cumplen predicados o selección del mapa ---
+        scope = st.radio("Apply to", ["All rows", "Matching rows", "Map selection"], horizontal=True)
+        base_df = st.session_state.latest_edited
+        mask = None
+        if scope == "Matching rows":
+            with st.expander("Row filter", expanded=True):
+                c_a, c_b = st.columns(2)
+                dbm_min = c_a.number_input("dBm ≥", value=None, step=1.0)
+                dbm_max = c_b.number_input("dBm ≤", value=None, step=1.0)
+                id_min = c_a.number_input("ID ≥", value=None, step=1)
+                id_max = c_b.number_input("ID ≤", value=None, step=1)
+                gateways = st.multiselect(
+                    "Gateway",
+                    sorted(base_df["Gateway"].fillna("").astype(str).unique()) if "Gateway" in base_df.columns else [],
+                )
+                sources = st.multiselect(
+                    "Source document",
+                    sorted(base_df["Service Address - Functional Location"].dropna().astype(str).unique())
+                    if "Service Address - Functional Location" in base_df.columns else [],
+                )
+            mask = build_row_mask(
+                base_df, dbm_min=dbm_min, dbm_max=dbm_max, gateways=gateways,
+                sources=sources, id_min=id_min, id_max=id_max,
+            )
+        elif scope == "Map selection":
+            mask = build_row_mask(base_df, ids=st.session_state.get("map_selection_ids", []))
+            st.caption("Draw a rectangle or polygon on the map below to select points.")
+        if mask is not None:
+            st.caption(f"{int(mask.sum())} of {len(base_df)} rows selected")
+
+        if st.button("📌 Apply value", disabled=mask is not None and not mask.any()):
+            new_df = apply_bulk_value(
+                st.session_state.latest_edited.copy(), col_sel, val,
+                mask=mask, undo_stack=st.session_state.bulk_undo,
+            )
+            st.session_state.validation_errors = revalidate(
+                st.session_state.get("validation_errors"), new_df, rules,
+                {col_sel: st.session_state.bulk_undo[-1]["labels"]},
+            )
             st.session_state.edited_df = new_df
             st.session_state.latest_edited = new_df.copy()
+            mark_dirty([col_sel])
+            st.rerun()
+
+        if st.button("↩️ Undo bulk edit", disabled=not st.session_state.bulk_undo):
+            last = st.session_state.bulk_undo[-1]
+            new_df = undo_bulk_value(st.session_state.latest_edited.copy(), st.session_state.bulk_undo)
+            st.session_state.validation_errors = revalidate(
+                st.session_state.get("validation_errors"), new_df, rules,
+                {last["column"]: last["labels"]},
+            )
+            st.session_state.edited_df = new_df
+            st.session_state.latest_edited = new_df.copy()
+            mark_dirty([last["column"]])
             st.rerun()
 
     with col2:
@@ -196,59 +505,122 @@ with tab1:
         if st.button("🕒 Generate each 7 min"):
             incs = generate_time_windows(d0, t0, len(st.session_state.latest_edited))
             new_df = fill_temporal_columns(st.session_state.latest_edited.copy(), incs)
+            st.session_state.validation_errors = None
+            mark_dirty(TEMPORAL_COLUMNS)
             st.session_state.edited_df = new_df
             st.session_state.latest_edited = new_df.copy()
             st.rerun()
 
     with col3:
         st.write("💾 Download Excel")
+        rows_mode = st.radio("Rows", ["All rows", "Changed since last export"], horizontal=True)
+        delta = rows_mode != "All rows"
+        split_by = st.selectbox("Split files by", ["None"] + list(PARTITION_KEYS), disabled=delta)
+        prev_fp = st.session_state.get("export_fp")
+        if delta:
+            st.caption(
+                f"Last export: {st.session_state.export_fp_at}" if prev_fp is not None
+                else "No previous export: every row is exported as inserted."
+            )
 
         if st.button("Generate Excel"):
             df_check = st.session_state.edited_df.copy()
+            exported_at = datetime.now().isoformat(timespec="seconds")
+
+            if delta:
+                zip_bytes, manifest, curr_fp = export_delta_zip(
+                    df_check, template_cols, prev_fp, previous_at=st.session_state.get("export_fp_at")
+                )
+                exported = df_check[df_check["ID point"].isin([r["ID point"] for r in manifest["rows"]])]
+            else:
+                curr_fp = row_fingerprints(df_check, template_cols)
+                exported = df_check
 
             # Verificación estricta: columnas requeridas deben estar completas
-            missing_values = []
-            for col in config.required_columns:
-                if col in df_check.columns:
-                    if df_check[col].apply(lambda x: pd.isna(x) or str(x).strip() == "").any():
-                        missing_values.append(col)
+            missing_values = missing_required(exported, config.required_columns)
 
             if missing_values:
                 st.error(f"The Excel file cannot be generated. The following required columns have empty values: {', '.join(missing_values)}")
+            elif delta:
+                counts = manifest["counts"]
+                st.caption(
+                    f"{counts['inserted']} inserted · {counts['modified']} modified · {counts['deleted']} deleted"
+                )
+                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+                st.download_button(
+                    "⬇️ Download changes ZIP",
+                    data=zip_bytes,
+                    file_name=f"Staging Dimensioned Records_Prod_changes_{ts}.zip",
+                    mime="application/zip",
+                    on_click=commit_export_baseline, args=(curr_fp, exported_at),
+                )
+            elif split_by != "None":
+                # Un fichero por partición, escritos en paralelo y entregados en un ZIP
+                zip_bytes, counts = export_partitioned_zip(
+                    df_check, PARTITION_KEYS[split_by], template_cols
+                )
+                st.caption(f"{len(counts)} files · " + ", ".join(f"{k} ({n})" for k, n in counts.items()))
+                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+                st.download_button(
+                    "⬇️ Download ZIP",
+                    data=zip_bytes,
+                    file_name=f"Staging Dimensioned Records_Prod_by_{split_by}_{ts}.zip",
+                    mime="application/zip",
+                    on_click=commit_export_baseline, args=(curr_fp, exported_at),
+                )
             else:
-                df_out = df_check.copy()
-                for c in template_cols:
-                    if c not in df_out.columns:
-                        df_out[c] = ""
-                df_out = df_out[template_cols]
-
-                buf = io.BytesIO()
-                with pd.ExcelWriter(buf, engine="openpyxl") as w:
-                    df_out.to_excel(w, index=False)
-                buf.seek(0)
+                df_out = build_export_frame(df_check, template_cols)
+                buf = io.BytesIO(to_xlsx_bytes(df_out))
 
                 ts = datetime.now().strftime("%Y%m%d_%H%M%S")
                 st.download_button(
                     "⬇️ Download Excel",
                     data=buf,
                     file_name="Staging Dimensioned Records_Prod.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    mime=XLSX_MIME,
+                    on_click=commit_export_baseline, args=(curr_fp, exported_at),
                 )
 
     st.markdown("---")
-    
-    render_map()
 
-    col_spacer, col_spacer, col_spacer, col_spacer, col1, col2, col3, col4, col_spacer, col_spacer, col_spacer, col_spacer = st.columns(12)
+    # --- Planificador de gateways para puntos sin cobertura ---
+    with st.expander("📡 Gateway planner"):
+        c_r, c_n, c_b = st.columns([2, 2, 1])
+        radius_m = c_r.number_input("Coverage radius (m)", min_value=10, value=config.planning_radius_m, step=10)
+        max_sites = c_n.number_input("Max. new gateways", min_value=1, value=config.planning_max_sites, step=1)
+        c_b.write("")
+        if c_b.button("Plan gateways"):
+            sites, covered = plan_gateways(st.session_state.latest_edited, radius_m, max_sites)
+            st.session_state.gateway_plan = {
+                "sites": sites,
+                "radius_m": radius_m,
+                "summary": coverage_summary(st.session_state.latest_edited, covered),
+            }
+        plan = st.session_state.get("gateway_plan")
+        if plan is not None:
+            summary = plan["summary"]
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Under-served points", summary["underserved"])
+            m2.metric("Proposed gateways", len(plan["sites"]))
+            m3.metric("Covered before", f"{summary['served_before']} / {summary['total']}")
+            m4.metric(
+                "Covered after", f"{summary['served_after']} / {summary['total']}",
+                delta=summary["served_after"] - summary["served_before"],
+            )
+            if st.button("Clear proposal"):
+                st.session_state.pop("gateway_plan", None)
+                st.rerun()
 
-    with col1:
-        st.markdown("🟢 **Good**", unsafe_allow_html=True)
-    with col2:
-        st.markdown("🟠 **Enough**", unsafe_allow_html=True)
-    with col3:
-        st.markdown("🔴 **Insufficient**", unsafe_allow_html=True)
-    with col4:
-        st.markdown("⚪ **No data**", unsafe_allow_html=True)
+    render_map(st.session_state.get("gateway_plan"), config)
+
+    # Leyenda generada a partir de [SIGNAL_BANDS]
+    bands, no_data = signal_config(config)
+    legend = bands + [no_data]
+    pad = max((12 - len(legend)) // 2, 0)
+    legend_cols = st.columns(12)[pad:pad + len(legend)]
+    for lcol, band in zip(legend_cols, legend):
+        with lcol:
+            st.markdown(f"{band.icon} **{band.label}**", unsafe_allow_html=True)
 
     st.markdown(
         "<div style='text-align: center; color: gray; font-size: 0.875rem;'>"
@@ -262,54 +634,7 @@ with tab1:
 ###########################################
 
 with tab2:
-    import contextily as ctx
-    import matplotlib.pyplot as plt
-
     # --- Funciones auxiliares ---
-    def save_geoposition_map(df, path="map_contextual.png"):
-        fig, ax = plt.subplots(figsize=(12, 8))
-        df_with = df[df["dBm"].notna()]
-        df_without = df[df["dBm"].isna()]
-
-        if not df_without.empty:
-            ax.scatter(
-                df_without["Longitude - Functional Location"],
-                df_without["Latitude - Functional Location"],
-                color="lightgray", s=50, alpha=0.9, edgecolors="black"
-            )
-        if not df_with.empty:
-            def color_for_dbm(dbm):
-                if dbm >= -69:
-                    return "#009933"
-                elif -80 <= dbm < -69:
-                    return "#FFA500"
-                elif dbm < -80:
-                    return "#FF0000"
-                return "lightgray"
-            colors = df_with["dBm"].apply(color_for_dbm)
-            ax.scatter(
-                df_with["Longitude - Functional Location"],
-                df_with["Latitude - Functional Location"],
-                color=colors, s=60, alpha=0.9, edgecolors="black"
-            )
-
-        valid_df = df.dropna(subset=["Latitude - Functional Location", "Longitude - Functional Location"])
-        if valid_df.empty:
-            return
-        lat_min, lat_max = valid_df["Latitude - Functional Location"].min(), valid_df["Latitude - Functional Location"].max()
-        lon_min, lon_max = valid_df["Longitude - Functional Location"].min(), valid_df["Longitude - Functional Location"].max()
-        lat_center = (lat_max + lat_min) / 2
-        lon_center = (lon_max + lon_min) / 2
-        delta = max((lat_max - lat_min) / 2, (lon_max - lon_min) / 2) + 0.05
-        ax.set_xlim(lon_center - delta, lon_center + delta)
-        ax.set_ylim(lat_center - delta, lat_center + delta)
-
-        ctx.add_basemap(ax, crs="EPSG:4326", source=ctx.providers.OpenStreetMap.Mapnik)
-        ax.axis("off")
-        plt.tight_layout()
-        plt.savefig(path, bbox_inches="tight", pad_inches=0)
-        plt.close()
-
     def safe_unique(df, col):
         return df[col].dropna().unique().tolist() if col in df.columns else []
 
@@ -324,11 +649,10 @@ with tab2:
             if col not in df_full.columns:
                 df_full[col] = ""
 
-        save_geoposition_map(df_full, "map_contextual.png")
-
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            st.image("map_contextual.png", use_container_width=True)
+        if save_geoposition_map(df_full, "map_contextual.png", signal_config(config)):
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col2:
+                st.image("map_contextual.png", use_container_width=True)
 
         # --- Estadísticas básicas ---
         total_ordenes = len(df_full)
@@ -386,58 +710,12 @@ with tab2:
             "date_prefet": date_prefet,
         }
 
-        from docxtpl import DocxTemplate
-
         if st.button("📄 Generate Report DOCX"):
             # --- Agrupar datos reales ---
-            axes = []
-
-            if "Parent" in df_full.columns and "Child" in df_full.columns:
-                # Si Parent/Child están vacíos, usar Service Address o Summary como fallback
-                if df_full["Parent"].replace("", pd.NA).isna().all() and df_full["Child"].replace("", pd.NA).isna().all():
-                    if "Service Address - Functional Location" in df_full.columns:
-                        grouped = (
-                            df_full.groupby("Service Address - Functional Location")
-                            .size()
-                            .reset_index(name="nb")
-                            .rename(columns={"Service Address - Functional Location": "axe"})
-                        )
-                        for _, r in grouped.iterrows():
-                            axes.append({
-                                "commune": "",
-                                "axe": r["axe"],
-                                "nom_axe": r["axe"],
-                                "nb": int(r["nb"]),
-                            })
-                    elif "Summary - Work Order" in df_full.columns:
-                        grouped = (
-                            df_full.groupby("Summary - Work Order")
-                            .size()
-                            .reset_index(name="nb")
-                            .rename(columns={"Summary - Work Order": "axe"})
-                        )
-                        for _, r in grouped.iterrows():
-                            axes.append({
-                                "commune": "",
-                                "axe": r["axe"],
-                                "nom_axe": r["axe"],
-                                "nb": int(r["nb"]),
-                            })
-                else:
-                    grouped = (
-                        df_full.groupby(["Parent", "Child"])
-                        .size()
-                        .reset_index(name="nb")
-                    )
-                    for _, r in grouped.iterrows():
-                        axes.append({
-                            "commune": r["Parent"],
-                            "axe": r["Child"],
-                            "nom_axe": f"{r['Child']}",
-                            "nb": int(r["nb"]),
-                        })
-            else:
+            axes = build_axes(df_full)
+            if axes is None:
                 st.warning("No Parent/Child columns found in data.")
+                axes = []
 
             # Mostrar previsualización del resumen
             if axes:
@@ -446,37 +724,36 @@ with tab2:
             else:
                 st.warning("No se encontraron puntos para incluir en el informe.")
 
-            # Contexto para plantilla Word
-            context_tpl = {
-                "date": report_meta["date"],
-                "region_departement": report_meta["region_departement"],
-                "point_focal": report_meta["point_focal"],
-                "rep_aner": report_meta["rep_aner"],
-                "rep_salvi": report_meta["rep_salvi"],
-                "total_commune": total_points,
-                "total_affectes": report_meta["total_affectes"],
-                "surplus": report_meta["surplus"],
-                "observations": report_meta["observations"],
-                "axes": axes,
-                "nom_prefet": report_meta["nom_prefet"],
-                "date_prefet": report_meta["date_prefet"],
-                "date_aner": report_meta["date_aner"],
-                "date_salvi": report_meta["date_salvi"],
-            }
-
             # --- Generar DOCX ---
-            doc = DocxTemplate("report_template.docx")
-            doc.render(context_tpl)
-            output_path = "informe.docx"
-            doc.save(output_path)
+            docx_bytes = render_report_docx(report_context(report_meta, axes, total_points))
 
-            with open(output_path, "rb") as f:
-                st.download_button(
-                    "⬇️ Download Report DOCX",
-                    f,
-                    file_name="report.docx",
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            st.download_button(
+                "⬇️ Download Report DOCX",
+                docx_bytes,
+                file_name="report.docx",
+                mime=DOCX_MIME
+            )
+
+        # --- Lote: un informe firmado por comuna/departamento ---
+        st.markdown("---")
+        st.write("📦 One report per commune")
+        batch_df = report_frame(st.session_state.edited_df)
+        n_communes = commune_keys(batch_df).nunique()
+        with_map = st.checkbox("Include contextual map for each commune", value=True)
+        if st.button(f"🗂️ Generate {n_communes} commune reports (ZIP)", disabled=n_communes == 0):
+            with st.spinner("Rendering commune reports..."):
+                zip_file, counts = generate_commune_reports_zip(
+                    batch_df, report_meta, with_map=with_map, signal=signal_config(config)
                 )
+            st.dataframe(pd.DataFrame({"Commune": list(counts), "Points": list(counts.values())}))
+            with zip_file:
+                zip_bytes = zip_file.read()
+            st.download_button(
+                "⬇️ Download reports ZIP",
+                zip_bytes,
+                file_name=f"reports_by_commune_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                mime="application/zip"
+            )
 
         st.markdown(
             "<div style='text-align: center; color: gray; font-size: 0.875rem;'>Developed in Streamlit by CM SALVI • 2025</div>",
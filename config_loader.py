@@ -1,6 +1,22 @@
 import configparser
-from dataclasses import dataclass
-from typing import List, Dict
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
+
+@dataclass(frozen=True)
+class SignalBand:
+    label: str
+    min_dbm: Optional[float]
+    max_dbm: Optional[float]
+    color: str
+    gateway: Optional[str]
+    icon: str = ""
+
+DEFAULT_SIGNAL_BANDS = [
+    SignalBand("Good", -70, -10, "#009933", "YES", "🟢"),
+    SignalBand("Enough", -80, -70, "#FFA500", "NO", "🟠"),
+    SignalBand("Insufficient", -200, -80, "#FF0000", "NO", "🔴"),
+]
+DEFAULT_NO_DATA = SignalBand("No data", None, None, "lightgray", None, "⚪")
 
 @dataclass
 class Config:
@@ -11,6 +27,15 @@ class Config:
     parent_child_map: Dict[str, List[str]]
     excel_autoload_path: str
     excel_template_path: str
+    cache_max_entries: int = 200
+    cache_max_mb: int = 512
+    editor_page_size: int = 200
+    editor_window_threshold: int = 5000
+    validation: Dict[str, str] = field(default_factory=dict)
+    planning_radius_m: int = 300
+    planning_max_sites: int = 50
+    signal_bands: List[SignalBand] = field(default_factory=lambda: list(DEFAULT_SIGNAL_BANDS))
+    signal_no_data: SignalBand = field(default_factory=lambda: DEFAULT_NO_DATA)
 
 def _safe_get(cfg, sect, opt, default=""):
     try:
@@ -18,10 +43,38 @@ def _safe_get(cfg, sect, opt, default=""):
     except (configparser.NoSectionError, configparser.NoOptionError):
         return default
 
+def _safe_getint(cfg, sect, opt, default):
+    try:
+        return cfg.getint(sect, opt)
+    except (configparser.NoSectionError, configparser.NoOptionError, ValueError):
+        return default
+
+def _parse_signal_bands(cfg):
+    """[SIGNAL_BANDS] etiqueta = mín, máx, color, Gateway, icono (sin mín/máx = sin dato)."""
+    if not cfg.has_section("SIGNAL_BANDS"):
+        return list(DEFAULT_SIGNAL_BANDS), DEFAULT_NO_DATA
+
+    bands, no_data = [], DEFAULT_NO_DATA
+    for label in cfg["SIGNAL_BANDS"]:
+        parts = [x.strip() for x in cfg.get("SIGNAL_BANDS", label).split(",")]
+        lo, hi, color, gateway, icon = (parts + [""] * 5)[:5]
+        if not lo and not hi:
+            no_data = SignalBand(label, None, None, color or "lightgray", None, icon)
+            continue
+        bands.append(SignalBand(
+            label,
+            float(lo) if lo else float("-inf"),
+            float(hi) if hi else float("inf"),
+            color,
+            gateway or None,
+            icon,
+        ))
+    return bands, no_data
+
 def load_config(path: str = "config.ini") -> Config:
     cfg = configparser.ConfigParser()
     cfg.optionxform = str
-    cfg.read(path)
+    cfg.read(path, encoding="utf-8")
 
     protected_columns = [c.strip() for c in _safe_get(cfg, "PROTECTED_COLUMNS", "columns").split(",") if c]
     required_columns = [c.strip() for c in _safe_get(cfg, "REQUIRED_COLUMNS", "columns").split(",") if c]
@@ -36,6 +89,9 @@ def load_config(path: str = "config.ini") -> Config:
         for k in cfg["PARENT_CHILD_RELATIONS"]:
             parent_child_map[k] = [x.strip() for x in cfg.get("PARENT_CHILD_RELATIONS", k).split(",")]
 
+    validation = dict(cfg["VALIDATION"]) if cfg.has_section("VALIDATION") else {}
+    signal_bands, signal_no_data = _parse_signal_bands(cfg)
+
     return Config(
         protected_columns,
         dropdown_values,
@@ -43,7 +99,16 @@ def load_config(path: str = "config.ini") -> Config:
         _safe_get(cfg, "GENERAL", "base_save_path", "output"),
         parent_child_map,
         _safe_get(cfg, "GENERAL", "excel_autoload_path", ""),
-        _safe_get(cfg, "GENERAL", "excel_template_path", "test.xlsx")
+        _safe_get(cfg, "GENERAL", "excel_template_path", "test.xlsx"),
+        _safe_getint(cfg, "CACHE", "max_entries", 200),
+        _safe_getint(cfg, "CACHE", "max_mb", 512),
+        _safe_getint(cfg, "EDITOR", "page_size", 200),
+        _safe_getint(cfg, "EDITOR", "window_threshold", 5000),
+        validation,
+        _safe_getint(cfg, "PLANNING", "radius_m", 300),
+        _safe_getint(cfg, "PLANNING", "max_sites", 50),
+        signal_bands,
+        signal_no_data,
     )
 
 def load_excel_template_columns(path: str) -> List[str]:
@@ -1,10 +1,141 @@
 from datetime import datetime, timedelta
 import streamlit as st
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from matplotlib.path import Path
 
-def apply_bulk_value(df, column, value):
-    df[column] = value
+MAX_UNDO = 20
+
+def apply_bulk_value(df, column, value, mask=None, undo_stack=None):
+    """Asigna value a column en las filas de mask (todas si es None), en una sola pasada.
+
+    Si se pasa undo_stack, guarda los valores previos de las celdas afectadas
+    y el valor asignado (para no deshacer ediciones posteriores de esas celdas).
+    """
+    if mask is None:
+        mask = np.ones(len(df), dtype=bool)
+    mask = np.asarray(mask, dtype=bool)
+    labels = df.index[mask]
+
+    if undo_stack is not None:
+        existed = column in df.columns
+        undo_stack.append({
+            "column": column,
+            "labels": labels,
+            "old": df.loc[labels, column].copy() if existed else None,
+            "value": value,
+            "existed": existed,
+        })
+        del undo_stack[:-MAX_UNDO]
+
+    if mask.all():
+        df[column] = value
+    else:
+        df.loc[labels, column] = value
     return df
 
+def undo_bulk_value(df, undo_stack):
+    """Deshace la última asignación masiva registrada en undo_stack.
+
+    Solo se restauran las celdas que aún conservan el valor asignado; las que se
+    han editado después se dejan como están.
+    """
+    if not undo_stack:
+        return df
+    entry = undo_stack.pop()
+    column = entry["column"]
+    if column not in df.columns:
+        return df
+    labels = entry["labels"].intersection(df.index)
+    current = df.loc[labels, column]
+    value = entry["value"]
+    untouched = current.eq(value) | (current.isna() & pd.isna(value))
+    keep = labels[untouched.to_numpy(dtype=bool)]
+
+    if not entry["existed"]:
+        if len(keep) == len(df):
+            return df.drop(columns=[column])
+        df.loc[keep, column] = None
+        return df
+    df.loc[keep, column] = entry["old"].loc[keep]
+    return df
+
+# ─── Máscaras de filas para la edición masiva ──────────────────────────────────
+
+def build_row_mask(df, dbm_min=None, dbm_max=None, gateways=None, sources=None,
+                   id_min=None, id_max=None, ids=None):
+    """Máscara booleana vectorizada a partir de predicados (None = sin filtro)."""
+    mask = np.ones(len(df), dtype=bool)
+
+    if (dbm_min is not None or dbm_max is not None) and "dBm" in df.columns:
+        dbm = pd.to_numeric(df["dBm"], errors="coerce").to_numpy(dtype=float)
+        if dbm_min is not None:
+            mask &= dbm >= dbm_min
+        if dbm_max is not None:
+            mask &= dbm <= dbm_max
+    if gateways and "Gateway" in df.columns:
+        mask &= df["Gateway"].fillna("").isin(gateways).to_numpy()
+    if sources and "Service Address - Functional Location" in df.columns:
+        mask &= df["Service Address - Functional Location"].isin(sources).to_numpy()
+    if id_min is not None or id_max is not None or ids is not None:
+        pid = pd.to_numeric(df["ID point"], errors="coerce").to_numpy(dtype=float)
+        if id_min is not None:
+            mask &= pid >= id_min
+        if id_max is not None:
+            mask &= pid <= id_max
+        if ids is not None:
+            mask &= np.isin(pid, np.asarray(ids, dtype=float))
+    return mask
+
+class PointIndex:
+    """KD-tree sobre (lon, lat) para resolver selecciones del mapa."""
+
+    def __init__(self, df):
+        coords = df[["Longitude - Functional Location", "Latitude - Functional Location"]]
+        coords = coords.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        valid = ~np.isnan(coords).any(axis=1)
+        self.coords = coords
+        self.ids = df["ID point"].to_numpy()[valid]
+        self.tree = cKDTree(coords[valid]) if valid.any() else None
+
+    def matches(self, df):
+        coords = df[["Longitude - Functional Location", "Latitude - Functional Location"]]
+        coords = coords.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        return coords.shape == self.coords.shape and np.array_equal(coords, self.coords, equal_nan=True)
+
+    def ids_in_polygon(self, ring):
+        """IDs de los puntos dentro de un anillo [(lon, lat), ...] (GeoJSON)."""
+        if self.tree is None or len(ring) < 3:
+            return np.array([], dtype=self.ids.dtype)
+        ring = np.asarray(ring, dtype=float)
+        lo, hi = ring.min(axis=0), ring.max(axis=0)
+        center = (lo + hi) / 2
+        radius = np.hypot(*(hi - lo)) / 2
+        cand = np.asarray(self.tree.query_ball_point(center, r=radius), dtype=int)
+        if not len(cand):
+            return np.array([], dtype=self.ids.dtype)
+        inside = Path(ring).contains_points(self.tree.data[cand])
+        return self.ids[cand[inside]]
+
+def ids_in_drawings(index, drawings):
+    """Une los IDs contenidos en los polígonos/rectángulos dibujados en el mapa."""
+    selected = []
+    for feat in drawings or []:
+        geom = (feat or {}).get("geometry") or {}
+        if geom.get("type") == "Polygon":
+            polys = [geom["coordinates"]]
+        elif geom.get("type") == "MultiPolygon":
+            polys = geom["coordinates"]
+        else:
+            continue
+        for poly in polys:
+            if poly:
+                selected.append(index.ids_in_polygon(poly[0]))
+    if not selected:
+        return np.array([])
+    return np.unique(np.concatenate(selected))
+
 from datetime import datetime, timedelta
 
 def generate_time_windows(start_date, start_time, count):
@@ -26,17 +157,21 @@ def generate_time_windows(start_date, start_time, count):
     return times
 
 
+FULL_FROM = [
+    "Promised window From - Work Order",
+    "StartTime - Bookable Resource Booking",
+]
+FULL_TO = [
+    "Promised window To - Work Order",
+    "EndTime - Bookable Resource Booking",
+]
+TIME_FROM = ["Time window From - Work Order"]
+TIME_TO = ["Time window To - Work Order"]
+TEMPORAL_COLUMNS = FULL_FROM + FULL_TO + TIME_FROM + TIME_TO
+
+
 def fill_temporal_columns(df, incs):
-    full_from = [
-        "Promised window From - Work Order",
-        "StartTime - Bookable Resource Booking",
-    ]
-    full_to = [
-        "Promised window To - Work Order",
-        "EndTime - Bookable Resource Booking",
-    ]
-    time_from = ["Time window From - Work Order"]
-    time_to = ["Time window To - Work Order"]
+    full_from, full_to, time_from, time_to = FULL_FROM, FULL_TO, TIME_FROM, TIME_TO
 
     for c in full_from:
         if c in df.columns:
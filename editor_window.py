@@ -0,0 +1,136 @@
+import pandas as pd
+import numpy as np
+from signals import signal_config, signal_labels
+
+# ─── Editor por ventanas (paginado) ─────────────────────────────────────────────
+#
+# En lugar de enviar todo el DataFrame al navegador, solo se serializa una página.
+# Filtros y ordenación se resuelven en el servidor con índices precalculados
+# (valor → posiciones y argsort por columna), que se invalidan por columna
+# cuando una edición la modifica.
+
+FILTER_COLUMNS = {
+    "Parent": "Name - Parent Functional Location",
+    "Child": "Name - Child Functional Location",
+    "Resource": "Name - Bookable Resource Booking",
+    "dBm band": "dBm",
+    "Gateway": "Gateway",
+}
+
+EMPTY_LABEL = "(empty)"
+
+
+class WindowIndex:
+    """Índices de filtrado/ordenación sobre un DataFrame, construidos bajo demanda."""
+
+    def __init__(self, df, signal=None):
+        self.df = df
+        self.signal = signal or signal_config()
+        self._keys = {}
+        self._groups = {}
+        self._orders = {}
+        self._id_index = None
+
+    def _column_keys(self, name):
+        if name not in self._keys:
+            col = FILTER_COLUMNS[name]
+            if col not in self.df.columns:
+                keys = pd.Series("", index=self.df.index)
+            elif name == "dBm band":
+                keys = signal_labels(self.df[col], self.signal)
+            else:
+                keys = self.df[col].astype("string").fillna("").str.strip()
+            self._keys[name] = keys.replace("", EMPTY_LABEL).to_numpy(dtype=object)
+        return self._keys[name]
+
+    def options(self, name):
+        return sorted(self.groups(name))
+
+    def groups(self, name):
+        if name not in self._groups:
+            keys = self._column_keys(name)
+            codes, uniques = pd.factorize(keys)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+            self._groups[name] = dict(zip(uniques, np.split(order, bounds)))
+        return self._groups[name]
+
+    def order(self, name):
+        if name not in self._orders:
+            if name == "ID point":
+                vals = pd.to_numeric(self.df["ID point"], errors="coerce").to_numpy(dtype=float)
+            elif name == "dBm band" and "dBm" in self.df.columns:
+                vals = pd.to_numeric(self.df["dBm"], errors="coerce").to_numpy(dtype=float)
+            else:
+                vals = pd.Categorical(self._column_keys(name), ordered=True).codes
+            self._orders[name] = np.argsort(vals, kind="stable")
+        return self._orders[name]
+
+    def positions_for_ids(self, ids):
+        if self._id_index is None:
+            self._id_index = pd.Index(self.df["ID point"])
+        return self._id_index.get_indexer(ids)
+
+    def invalidate(self, columns):
+        columns = set(columns)
+        for name, col in FILTER_COLUMNS.items():
+            if col in columns:
+                self._keys.pop(name, None)
+                self._groups.pop(name, None)
+                self._orders.pop(name, None)
+        if "ID point" in columns:
+            self._orders.pop("ID point", None)
+            self._id_index = None
+
+    def select(self, filters=None, sort_by=None, ascending=True):
+        """Posiciones (iloc) que cumplen los filtros, en el orden pedido."""
+        n = len(self.df)
+        mask = np.ones(n, dtype=bool)
+        for name, values in (filters or {}).items():
+            if not values:
+                continue
+            groups = self.groups(name)
+            hit = np.zeros(n, dtype=bool)
+            for v in values:
+                if v in groups:
+                    hit[groups[v]] = True
+            mask &= hit
+
+        order = self.order(sort_by) if sort_by else np.arange(n)
+        if not ascending:
+            order = order[::-1]
+        return order[mask[order]]
+
+
+def get_window_index(state, df, signal=None):
+    """Reutiliza el índice guardado en sesión mientras el DataFrame sea el mismo objeto."""
+    idx = state.get("window_index")
+    if idx is None or idx.df is not df:
+        idx = WindowIndex(df, signal)
+        state["window_index"] = idx
+    return idx
+
+
+def merge_page_edits(df, page_before, page_after, index=None, id_col="ID point"):
+    """Aplica sobre df las celdas cambiadas en la página, emparejando por id_col.
+
+    Devuelve {columna: etiquetas de las filas modificadas}.
+    """
+    if index is not None:
+        pos = index.positions_for_ids(page_before[id_col])
+    else:
+        pos = pd.Index(df[id_col]).get_indexer(page_before[id_col])
+    labels = df.index[pos]
+
+    changes = {}
+    for col in page_before.columns:
+        if col == id_col or col not in page_after.columns or col not in df.columns:
+            continue
+        a = page_before[col].reset_index(drop=True)
+        b = page_after[col].reset_index(drop=True)
+        diff = ~(a.eq(b) | (a.isna() & b.isna()))
+        if diff.any():
+            rows = diff.to_numpy()
+            df.loc[labels[rows], col] = b[rows].to_numpy()
+            changes[col] = labels[rows]
+    return changes
@@ -0,0 +1,143 @@
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from zipfile import ZipFile, ZIP_DEFLATED
+from datetime import datetime
+import io, os, multiprocessing, json
+from utils import unique_filenames
+
+# ─── Exportación a Excel (fichero único o particionado) ────────────────────────
+#
+# Este módulo no importa streamlit: las funciones de escritura se ejecutan
+# en procesos del pool y deben poder serializarse. El pool usa "spawn": hacer
+# fork del servidor de Streamlit (multihilo) puede bloquear al hijo.
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+UNASSIGNED = "Unassigned"
+
+PARTITION_KEYS = {
+    "Owner": "Owner - Work Order",
+    "Resource": "Name - Bookable Resource Booking",
+    "Commune": "Name - Parent Functional Location",
+}
+
+
+def build_export_frame(df, template_cols):
+    """Columnas de la plantilla, en su orden, rellenando las que falten."""
+    out = df.copy()
+    for c in template_cols:
+        if c not in out.columns:
+            out[c] = ""
+    return out[template_cols]
+
+
+def to_xlsx_bytes(df, extra_sheets=None):
+    """XLSX con df en la primera hoja y, detrás, las hojas de extra_sheets {nombre: DataFrame}."""
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as w:
+        df.to_excel(w, index=False)
+        for name, sheet in (extra_sheets or {}).items():
+            sheet.to_excel(w, sheet_name=name, index=False)
+    return buf.getvalue()
+
+
+def _write_partition(args):
+    key, part = args
+    return key, to_xlsx_bytes(part)
+
+
+def export_partitioned_zip(df, key_col, template_cols, max_workers=None,
+                           base_name="Staging Dimensioned Records_Prod"):
+    """Un XLSX por valor de key_col, escritos en paralelo y volcados a un ZIP.
+
+    Devuelve (bytes del ZIP, {clave: nº de filas}).
+    """
+    out = build_export_frame(df, template_cols)
+    if key_col in df.columns:
+        keys = df[key_col].fillna("").astype(str).str.strip().replace("", UNASSIGNED)
+    else:
+        keys = pd.Series(UNASSIGNED, index=df.index)
+    parts = [(k, part) for k, part in out.groupby(keys.to_numpy(), sort=True)]
+    counts = {k: len(part) for k, part in parts}
+    names = unique_filenames(counts, UNASSIGNED)
+
+    buf = io.BytesIO()
+    workers = min(max_workers or os.cpu_count() or 1, max(len(parts), 1))
+    with ZipFile(buf, "w", ZIP_DEFLATED) as zf:
+        if workers <= 1:
+            results = map(_write_partition, parts)
+            for key, data in results:
+                zf.writestr(f"{base_name} - {names[key]}.xlsx", data)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_write_partition, p) for p in parts]
+                # Cada fichero se escribe en el ZIP en cuanto termina su proceso
+                for fut in as_completed(futures):
+                    key, data = fut.result()
+                    zf.writestr(f"{base_name} - {names[key]}.xlsx", data)
+    return buf.getvalue(), counts
+
+
+# ─── Exportación incremental (solo filas cambiadas) ────────────────────────────
+
+def row_fingerprints(df, template_cols, key="ID point"):
+    """Huella (hash de 64 bits) de cada fila sobre las columnas de la plantilla."""
+    frame = build_export_frame(df, template_cols)
+    frame = frame.astype(object).where(frame.notna(), "").astype(str)
+    return pd.DataFrame({
+        key: df[key].to_numpy(),
+        "fingerprint": pd.util.hash_pandas_object(frame, index=False).to_numpy(),
+    })
+
+
+def diff_fingerprints(prev, curr, key="ID point"):
+    """IDs insertados, modificados y borrados entre dos tablas de huellas."""
+    p = prev.drop_duplicates(key, keep="last").set_index(key)["fingerprint"]
+    c = curr.drop_duplicates(key, keep="last").set_index(key)["fingerprint"]
+    common = c.index.intersection(p.index)
+    return {
+        "inserted": c.index.difference(p.index),
+        "modified": common[c.loc[common].to_numpy() != p.loc[common].to_numpy()],
+        "deleted": p.index.difference(c.index),
+    }
+
+
+def export_delta_zip(df, template_cols, prev=None, key="ID point", previous_at=None,
+                     base_name="Staging Dimensioned Records_Prod"):
+    """ZIP con las filas insertadas/modificadas (formato plantilla) y un manifiesto.
+
+    La plantilla no incluye la clave: el XLSX lleva una hoja 'Keys' con key y tipo
+    de cambio de cada fila, en el mismo orden que la hoja de datos.
+
+    Devuelve (bytes del ZIP, manifiesto, huellas actuales).
+    """
+    curr = row_fingerprints(df, template_cols, key)
+    if prev is None or prev.empty:
+        prev = curr.iloc[0:0]
+    changes = diff_fingerprints(prev, curr, key)
+
+    upserts = changes["inserted"].append(changes["modified"])
+    mask = df[key].isin(upserts).to_numpy()
+    part = df[mask]
+    status = pd.Series("modified", index=part.index)
+    status[part[key].isin(changes["inserted"]).to_numpy()] = "inserted"
+
+    manifest = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "previous_export_at": previous_at,
+        "key": key,
+        "rows_total": int(len(df)),
+        "counts": {k: int(len(v)) for k, v in changes.items()},
+        # Mismo orden que las filas del fichero de cambios (y su hoja 'Keys')
+        "rows": [{key: k, "change": s} for k, s in zip(part[key].tolist(), status.tolist())],
+        "deleted": changes["deleted"].tolist(),
+    }
+
+    buf = io.BytesIO()
+    with ZipFile(buf, "w", ZIP_DEFLATED) as zf:
+        keys = pd.DataFrame({key: part[key].to_numpy(), "change": status.to_numpy()})
+        zf.writestr(
+            f"{base_name}_changes.xlsx",
+            to_xlsx_bytes(build_export_frame(part, template_cols), {"Keys": keys}),
+        )
+        zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1, default=str))
+    return buf.getvalue(), manifest, curr
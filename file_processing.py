@@ -2,9 +2,19 @@ import pandas as pd
 import streamlit as st
 import numpy as np
 from scipy.spatial import cKDTree
-from utils import classify_signal
+from utils import latlon_to_cartesian
+from signals import signal_config, gateway_verdict
+from ingest_cache import IngestCache, cache_key
+from jobs import JobCancelled
 from zipfile import ZipFile
-import os, io, xml.etree.ElementTree as ET
+import os, io, itertools, xml.etree.ElementTree as ET
+
+# Incrementar al cambiar el parser o los filtros: invalida la caché de ingesta
+PARSER_VERSION = "1"
+
+
+class GeoradarError(ValueError):
+    """Fichero de entrada no válido; el mensaje se muestra tal cual al usuario."""
 
 # ─── Extracción del KML desde KMZ ───────────────────────────────────────────────
 
@@ -23,8 +33,7 @@ def parse_kml_data(kml_bytes):
     try:
         tree = ET.ElementTree(ET.fromstring(kml_bytes))
     except Exception:
-        st.error("❌ KML file not valid.")
-        st.stop()
+        raise GeoradarError("❌ KML file not valid.")
 
     ns = {'kml': 'http://www.opengis.net/kml/2.2'}
     root = tree.getroot()
@@ -79,8 +88,7 @@ def parse_kml_data(kml_bytes):
                         })
 
     if not puntos:
-        st.error("❌ No valid coordinates found in KML after filtering.")
-        st.stop()
+        raise GeoradarError("❌ No valid coordinates found in KML after filtering.")
 
     return pd.DataFrame(puntos)
 
@@ -106,8 +114,7 @@ def load_georadar_file(geo_file):
             data = handle.read()
             kml_data = extract_kml_from_kmz(io.BytesIO(data))
         if not kml_data:
-            st.error("❌ .kml not found inside the KMZ file.")
-            st.stop()
+            raise GeoradarError("❌ .kml not found inside the KMZ file.")
         return parse_kml_data(kml_data)
 
     elif name.endswith(".kml"):
@@ -121,8 +128,7 @@ def load_georadar_file(geo_file):
     elif name.endswith(".csv"):
         df = pd.read_csv(handle)
         if not {"Latitud", "Longitud"}.issubset(df.columns):
-            st.error("Georadar file must contain 'Latitude' and 'Longitude' columns.")
-            st.stop()
+            raise GeoradarError("Georadar file must contain 'Latitude' and 'Longitude' columns.")
         df = df.rename(columns={
             "Latitud": "Latitude - Functional Location",
             "Longitud": "Longitude - Functional Location"
@@ -132,21 +138,40 @@ def load_georadar_file(geo_file):
         return df
 
     else:
-        st.error("File type not compatible (use KMZ/KML/CSV).")
-        st.stop()
+        raise GeoradarError("File type not compatible (use KMZ/KML/CSV).")
+
+def load_georadar_cached(geo_file, cache):
+    """Igual que load_georadar_file, pero sirve desde la caché los ficheros ya parseados.
+
+    Devuelve (DataFrame, hit) donde hit indica si se ha evitado el parseo.
+    """
+    if isinstance(geo_file, (str, os.PathLike)):
+        name = os.fspath(geo_file)
+        with open(geo_file, "rb") as f:
+            data = f.read()
+    else:
+        name = getattr(geo_file, "name", "") or ""
+        geo_file.seek(0)
+        data = geo_file.read()
+
+    key = cache_key(data, name, PARSER_VERSION)
+    df = cache.get(key)
+    if df is not None:
+        return df, True
+
+    df = load_georadar_file(geo_file)
+    cache.put(key, df)
+    return df, False
 
 # ─── Cobertura ─────────────────────────────────────────────────────────────────
 
-def asignar_cobertura_promedio_por_radio(geo_df, cov_df, radio_metros=15):
-    def latlon_to_cartesian(lat, lon):
-        R = 6371000
-        phi = np.radians(lat)
-        theta = np.radians(lon)
-        x = R * np.cos(phi) * np.cos(theta)
-        y = R * np.cos(phi) * np.sin(theta)
-        z = R * np.sin(phi)
-        return np.vstack((x, y, z)).T
+def asignar_cobertura_promedio_por_radio(geo_df, cov_df, radio_metros=15, chunk_size=5000,
+                                         progress=None, cancelled=None):
+    """Media de dBm de las muestras de cobertura a menos de radio_metros de cada punto.
 
+    Se procesa por bloques de chunk_size puntos: entre bloques se llama a
+    progress(hechos, total) y, si cancelled() es verdadero, se lanza JobCancelled.
+    """
     geo_coords = latlon_to_cartesian(
         geo_df["Latitude - Functional Location"],
         geo_df["Longitude - Functional Location"]
@@ -155,33 +180,85 @@ def asignar_cobertura_promedio_por_radio(geo_df, cov_df, radio_metros=15):
         cov_df["Latitud"],
         cov_df["Longitud"]
     )
+    valores = pd.to_numeric(cov_df["RSSI / RSCP (dBm)"], errors="coerce").to_numpy(dtype=float)
 
     tree = cKDTree(cov_coords)
-    vecinos_por_punto = tree.query_ball_point(geo_coords, r=radio_metros)
-
-    medias = []
-    for vecinos in vecinos_por_punto:
-        if vecinos:
-            valores = cov_df.iloc[vecinos]["RSSI / RSCP (dBm)"].dropna().tolist()
-            medias.append(round(np.mean(valores)) if valores else None)
-        else:
-            medias.append(None)
-
-    geo_df["dBm"] = medias
+    n = len(geo_coords)
+    medias = np.full(n, np.nan)
+    for start in range(0, n, chunk_size):
+        if cancelled is not None and cancelled():
+            raise JobCancelled()
+        stop = min(start + chunk_size, n)
+        vecinos = tree.query_ball_point(geo_coords[start:stop], r=radio_metros)
+
+        # Listas de vecinos aplanadas: media por punto con bincount
+        lens = np.fromiter(map(len, vecinos), dtype=np.intp, count=len(vecinos))
+        flat = np.fromiter(itertools.chain.from_iterable(vecinos), dtype=np.intp, count=int(lens.sum()))
+        owner = np.repeat(np.arange(stop - start), lens)
+        v = valores[flat]
+        ok = ~np.isnan(v)
+        sums = np.bincount(owner[ok], weights=v[ok], minlength=stop - start)
+        counts = np.bincount(owner[ok], minlength=stop - start)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medias[start:stop] = np.where(counts > 0, sums / counts, np.nan)
+        if progress is not None:
+            progress(stop, n)
+
+    medias = np.round(medias)
+    geo_df["dBm"] = medias if np.isnan(medias).any() else medias.astype(int)
     return geo_df
 
 # ─── Proceso principal ─────────────────────────────────────────────────────────
 
-def load_and_process_files(geo_files, cov_file=None, config=None):
-    """Procesa ficheros de georadar y cobertura, sin depender del nombre."""
+def snapshot_upload(f):
+    """Copia en memoria de un fichero subido (sigue siendo válida tras el rerun)."""
+    if f is None or isinstance(f, (str, os.PathLike)):
+        return f
+    f.seek(0)
+    buf = io.BytesIO(f.read())
+    buf.name = getattr(f, "name", "") or ""
+    return buf
+
+
+def process_files(geo_files, cov_file=None, config=None, progress=None, cancelled=None):
+    """Procesa ficheros de georadar y cobertura sin tocar la sesión de Streamlit.
+
+    progress(stage, done, total, message) recibe el avance; si cancelled() pasa a
+    ser verdadero entre pasos se lanza JobCancelled. Devuelve un dict con
+    geo_df, cov_df, los nombres de los ficheros y los mensajes informativos.
+    """
+    progress = progress or (lambda *a, **k: None)
+
+    def checkpoint():
+        if cancelled is not None and cancelled():
+            raise JobCancelled()
+
     files = geo_files if isinstance(geo_files, list) else [geo_files]
     frames = []
-
-    for f in files:
-        df_tmp = load_georadar_file(f)
+    names = []
+    messages = []
+
+    cache = None
+    if config is not None:
+        cache = IngestCache(config.base_save_path, config.cache_max_entries, config.cache_max_mb)
+
+    hits = 0
+    for i, f in enumerate(files):
+        checkpoint()
+        name = os.path.basename(os.fspath(f)) if isinstance(f, (str, os.PathLike)) else getattr(f, "name", "")
+        names.append(name)
+        progress("Reading Georadar files", i, len(files), name)
+        if cache is None:
+            df_tmp = load_georadar_file(f)
+        else:
+            df_tmp, hit = load_georadar_cached(f, cache)
+            hits += hit
         frames.append(df_tmp)
+    progress("Reading Georadar files", len(files), len(files), "")
 
     geo_df = pd.concat(frames, ignore_index=True)
+    if hits:
+        messages.append(f"{hits} of {len(files)} Georadar files served from cache")
 
     # Completar columnas mínimas
     geo_df["Service Account - Work Order"] = "ANER_Senegal"
@@ -189,25 +266,42 @@ def load_and_process_files(geo_files, cov_file=None, config=None):
     geo_df["Work Order Type - Work Order"] = "Installation"
 
     # Cobertura
+    cov_df = None
     if cov_file is not None:
+        checkpoint()
+        progress("Reading coverage file", 0, 1, getattr(cov_file, "name", ""))
         cov_df = pd.read_csv(cov_file)
         required_cov = {"Latitud", "Longitud", "RSSI / RSCP (dBm)"}
         if not required_cov.issubset(cov_df.columns):
-            st.error("Coverage file must contain 'Latitude', 'Longitude' and 'RSSI / RSCP (dBm)' columns.")
-            st.stop()
-
-        geo_df = asignar_cobertura_promedio_por_radio(geo_df, cov_df, radio_metros=15)
-        geo_df["Gateway"] = geo_df["dBm"].apply(classify_signal)
-
-        st.session_state.cov_df = cov_df.copy()
-        st.info(f"Coverage linked with → {geo_df['dBm'].notna().sum()} of {len(geo_df)} points")
+            raise GeoradarError("Coverage file must contain 'Latitude', 'Longitude' and 'RSSI / RSCP (dBm)' columns.")
+
+        checkpoint()
+        geo_df = asignar_cobertura_promedio_por_radio(
+            geo_df, cov_df, radio_metros=15,
+            progress=lambda done, total: progress(
+                "Linking coverage", done, total, f"points × {len(cov_df)} samples"
+            ),
+            cancelled=cancelled,
+        )
+        geo_df["Gateway"] = gateway_verdict(geo_df["dBm"], signal_config(config))
+
+        messages.append(f"Coverage linked with → {geo_df['dBm'].notna().sum()} of {len(geo_df)} points")
     else:
         if "dBm" not in geo_df.columns:
             geo_df["dBm"] = pd.NA
         if "Gateway" not in geo_df.columns:
             geo_df["Gateway"] = pd.NA
-        st.info("Only Georadar file uploaded, a Coverage file hasn't been uploaded.")
+        messages.append("Only Georadar file uploaded, a Coverage file hasn't been uploaded.")
+
+    return {"geo_df": geo_df, "cov_df": cov_df, "source_files": names, "messages": messages}
+
 
+def store_processed(result):
+    """Vuelca el resultado de process_files en la sesión."""
+    geo_df = result["geo_df"]
+    if result.get("cov_df") is not None:
+        st.session_state.cov_df = result["cov_df"].copy()
     st.session_state.df = geo_df.copy()
     st.session_state.geo_df = geo_df.copy()
+    st.session_state.source_files = result.get("source_files", [])
     st.session_state.processed = True
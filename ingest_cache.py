@@ -0,0 +1,87 @@
+import pyarrow.parquet as pq
+import os, hashlib, tempfile
+
+# ─── Caché de ficheros Georadar ya parseados ───────────────────────────────────
+#
+# La clave es el SHA-256 de los bytes del fichero + su extensión + la versión
+# del parser/filtros, de modo que un cambio en los filtros invalida la caché.
+# Los puntos se guardan en Parquet y se expulsan por LRU (fecha de acceso).
+
+CACHE_DIR = os.path.join("cache", "georadar")
+
+
+def cache_key(data, name, parser_version):
+    h = hashlib.sha256(data)
+    h.update(os.path.splitext(str(name).lower())[1].encode("utf-8"))
+    h.update(str(parser_version).encode("utf-8"))
+    return h.hexdigest()
+
+
+class IngestCache:
+    def __init__(self, base_save_path, max_entries=200, max_mb=512):
+        self.root = os.path.join(base_save_path, CACHE_DIR)
+        self.max_entries = max_entries
+        self.max_bytes = max_mb * 1024 * 1024
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".parquet")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pq.read_table(path, memory_map=True).to_pandas()
+        except FileNotFoundError:
+            return None
+        except Exception:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        try:
+            os.utime(path)  # marca de uso para el LRU
+        except FileNotFoundError:
+            pass
+        return df
+
+    def put(self, key, df):
+        path = self._path(key)
+        # Temporal único: dos trabajos pueden parsear el mismo fichero a la vez
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            df.reset_index(drop=True).to_parquet(tmp, index=False, compression="zstd")
+            os.replace(tmp, path)
+        except Exception:
+            # Columnas no serializables (p.ej. CSV con tipos mixtos): no se cachea
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        entries = []
+        for fname in os.listdir(self.root):
+            if not fname.endswith(".parquet"):
+                continue
+            try:
+                info = os.stat(os.path.join(self.root, fname))
+            except FileNotFoundError:
+                continue  # expulsada por otra sesión
+            entries.append((info.st_mtime, info.st_size, fname))
+
+        entries.sort(reverse=True)  # más recientes primero
+        total = 0
+        for i, (_, size, fname) in enumerate(entries):
+            total += size
+            if i >= self.max_entries or total > self.max_bytes:
+                try:
+                    os.remove(os.path.join(self.root, fname))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import threading, traceback, uuid
+
+# ─── Trabajos en segundo plano ─────────────────────────────────────────────────
+#
+# El runner vive a nivel de proceso (no en st.session_state), de modo que un
+# trabajo sigue ejecutándose si el navegador se recarga y la nueva sesión puede
+# recuperarlo por su id.
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.status = "running"  # running | done | failed | cancelled
+        self.stage = ""
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.started = datetime.now()
+        self.finished = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def report(self, stage, done=0, total=0, message=""):
+        """Callback de progreso para la función del trabajo."""
+        with self._lock:
+            self.stage, self.done, self.total, self.message = stage, done, total, message
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def fraction(self):
+        with self._lock:
+            return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+
+class JobRunner:
+    def __init__(self, max_workers=2, max_age_min=30):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # Resultados no recogidos (p.ej. pestaña cerrada) se liberan pasado este tiempo
+        self.max_age = timedelta(minutes=max_age_min)
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Lanza fn(*args, progress=..., cancelled=..., **kwargs) en segundo plano."""
+        job = Job(name)
+
+        def _run():
+            status = "failed"
+            try:
+                job.result = fn(*args, progress=job.report, cancelled=job.cancelled, **kwargs)
+                status = "done"
+            except JobCancelled:
+                status = "cancelled"
+            except Exception as e:
+                job.error = f"{e}"
+                job.traceback = traceback.format_exc()
+            finally:
+                # finished antes que status: un trabajo terminado siempre tiene fecha de fin
+                job.finished = datetime.now()
+                job.status = status
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(_run)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _prune(self):
+        limit = datetime.now() - self.max_age
+        for job in list(self._jobs.values()):
+            if not job.running and job.finished is not None and job.finished < limit:
+                self._jobs.pop(job.id, None)
@@ -0,0 +1,227 @@
+"""Prueba de carga multi-sesión de app.py con streamlit.testing.v1.AppTest.
+
+Cada sesión simulada corre en su propio proceso (AppTest no es thread-safe:
+cada run instala un Runtime simulado global). Ingiere un levantamiento sintético
+(KML + CSV de cobertura), abre la app, edita celdas, aplica un valor masivo,
+autocompleta fechas, completa las columnas requeridas y exporta a Excel. Se mide
+la latencia de cada rerun, la memoria de la sesión y el pico de RSS del proceso.
+
+Uso:
+    python loadtest.py --sessions 8 --rows 20000 --edits 5
+"""
+import argparse
+import dataclasses
+import io
+import json
+import multiprocessing
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from config_loader import load_config
+from file_processing import process_files
+
+APP = "app.py"
+FRAME_KEYS = ["df", "geo_df", "cov_df", "edited_df", "latest_edited", "validation_errors"]
+
+
+# ─── Datos sintéticos ──────────────────────────────────────────────────────────
+
+def synthetic_kml(n_points, seed=0, center=(14.7167, -17.4677), spread=0.05):
+    rng = np.random.default_rng(seed)
+    lat = center[0] + rng.uniform(-spread, spread, n_points)
+    lon = center[1] + rng.uniform(-spread, spread, n_points)
+    marks = "".join(
+        f"<Placemark><name>P{i}</name><Point><coordinates>{lo:.7f},{la:.7f},0</coordinates></Point></Placemark>"
+        for i, (la, lo) in enumerate(zip(lat, lon))
+    )
+    kml = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>'
+        f"<name>MapExport_loadtest_{seed}</name>{marks}</Document></kml>"
+    )
+    buf = io.BytesIO(kml.encode("utf-8"))
+    buf.name = f"survey_{seed}.kml"
+    return buf
+
+
+def synthetic_coverage(n_samples, seed=0, center=(14.7167, -17.4677), spread=0.05):
+    rng = np.random.default_rng(seed + 1)
+    df = pd.DataFrame({
+        "Latitud": center[0] + rng.uniform(-spread, spread, n_samples),
+        "Longitud": center[1] + rng.uniform(-spread, spread, n_samples),
+        "RSSI / RSCP (dBm)": rng.integers(-110, -40, n_samples),
+    })
+    buf = io.BytesIO(df.to_csv(index=False).encode("utf-8"))
+    buf.name = f"coverage_{seed}.csv"
+    return buf
+
+
+# ─── Sesión simulada ───────────────────────────────────────────────────────────
+
+def _widget(elements, label):
+    for el in elements:
+        if el.label == label:
+            return el
+    raise LookupError(f"Widget '{label}' not found")
+
+
+def _session_bytes(at):
+    total = 0
+    for key in FRAME_KEYS:
+        if key in at.session_state:
+            value = at.session_state[key]
+            if isinstance(value, pd.DataFrame):
+                total += int(value.memory_usage(deep=True).sum())
+    return total
+
+
+def _complete_required(df, config):
+    """Rellena las celdas vacías de las columnas requeridas con valores válidos."""
+    parent_col, child_col = "Name - Parent Functional Location", "Name - Child Functional Location"
+    for col in config.required_columns:
+        if col not in df.columns:
+            continue
+        empty = df[col].isna() | df[col].astype(str).str.strip().eq("")
+        if not empty.any():
+            continue
+        if col == child_col and parent_col in df.columns:
+            value = df[parent_col].map(lambda p: (config.parent_child_map.get(p) or ["loadtest"])[0])[empty]
+        elif config.dropdown_values.get(col):
+            value = config.dropdown_values[col][0]
+        else:
+            value = "loadtest"
+        df.loc[empty, col] = value
+    return df
+
+
+def run_session(task):
+    sid, args = task
+    if not args.tiles:
+        # Sin red en la mayoría de entornos de prueba: el mapa del informe sin teselas
+        import contextily
+        contextily.add_basemap = lambda *a, **k: None
+    # Caché de ingesta vacía y propia de la sesión: "ingest" mide un parseo real
+    # aunque las semillas sean deterministas y haya restos de ejecuciones previas
+    scratch = tempfile.mkdtemp(prefix=f"loadtest_{sid}_")
+    try:
+        return _run_session(sid, args, dataclasses.replace(load_config(), base_save_path=scratch))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _run_session(sid, args, config):
+    from streamlit.testing.v1 import AppTest
+
+    timings = []
+
+    def timed(action, fn):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((action, time.perf_counter() - t0))
+
+    # Ingesta (AppTest no admite file_uploader: se llama al mismo pipeline)
+    result = {}
+    timed("ingest", lambda: result.update(process_files(
+        [synthetic_kml(args.rows, seed=sid)],
+        synthetic_coverage(args.coverage, seed=sid) if args.coverage else None,
+        config,
+    )))
+
+    at = AppTest.from_file(APP, default_timeout=args.timeout)
+    at.session_state["df"] = result["geo_df"].copy()
+    at.session_state["geo_df"] = result["geo_df"].copy()
+    if result["cov_df"] is not None:
+        at.session_state["cov_df"] = result["cov_df"]
+    at.session_state["source_files"] = result["source_files"]
+    at.session_state["processed"] = True
+    timed("open", at.run)
+
+    rng = np.random.default_rng(sid)
+    owners = config.dropdown_values.get("Owner - Work Order", ["Owner"])
+    for _ in range(args.edits):
+        df = at.session_state["edited_df"]
+        df.iat[int(rng.integers(len(df))), df.columns.get_loc("Owner - Work Order")] = rng.choice(owners)
+        at.session_state["edited_df"] = df
+        timed("edit", at.run)
+
+    _widget(at.selectbox, "Column").set_value("Name - Bookable Resource Booking")
+    timed("select", at.run)
+    timed("bulk_apply", _widget(at.button, "📌 Apply value").click().run)
+    timed("autofill", _widget(at.button, "🕒 Generate each 7 min").click().run)
+
+    # Parent antes que Child: el valor de Child depende de la comuna
+    at.session_state["edited_df"] = _complete_required(at.session_state["edited_df"], config)
+    timed("complete", at.run)
+    timed("export", _widget(at.button, "Generate Excel").click().run)
+
+    errors = [e.value for e in at.exception]
+    if not at.get("download_button"):
+        errors.append("export produced no download button: " + "; ".join(str(e.value) for e in at.error))
+    return {
+        "session": sid,
+        "timings": timings,
+        "bytes": _session_bytes(at),
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "errors": errors,
+    }
+
+
+# ─── Informe ───────────────────────────────────────────────────────────────────
+
+def summarize(results):
+    rows = [(a, t) for r in results for a, t in r["timings"]]
+    lat = pd.DataFrame(rows, columns=["action", "seconds"])
+    table = lat.groupby("action", sort=False)["seconds"].agg(
+        n="count",
+        p50=lambda s: np.percentile(s, 50),
+        p90=lambda s: np.percentile(s, 90),
+        p99=lambda s: np.percentile(s, 99),
+        max="max",
+    )
+    mem = pd.Series([r["bytes"] for r in results]) / 2**20
+    rss = pd.Series([r["peak_rss_mib"] for r in results])
+    return table, mem, rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated planners")
+    parser.add_argument("--rows", type=int, default=5000, help="points per synthetic survey")
+    parser.add_argument("--coverage", type=int, default=20000, help="coverage samples (0 = no coverage file)")
+    parser.add_argument("--edits", type=int, default=5, help="single-cell edits per session")
+    parser.add_argument("--timeout", type=float, default=300, help="per-rerun timeout (s)")
+    parser.add_argument("--tiles", action="store_true", help="download real basemap tiles for the report map")
+    parser.add_argument("--json", help="write raw results to this file")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    # Un proceso nuevo por sesión (maxtasksperchild=1): RSS propio y sin estado global compartido
+    with multiprocessing.Pool(args.sessions, maxtasksperchild=1) as pool:
+        results = pool.map(run_session, [(sid, args) for sid in range(args.sessions)], chunksize=1)
+    wall = time.perf_counter() - t0
+
+    table, mem, rss = summarize(results)
+    print(f"\n{args.sessions} sessions × {args.rows} rows — wall time {wall:.1f}s\n")
+    print("Per-rerun latency (s):")
+    print(table.round(3).to_string())
+    print("\nSession state DataFrames (MiB): "
+          f"mean {mem.mean():.1f} · max {mem.max():.1f} · total {mem.sum():.1f}")
+    print(f"Peak RSS per session process (MiB): mean {rss.mean():.0f} · max {rss.max():.0f}")
+
+    failed = [r for r in results if r["errors"]]
+    for r in failed:
+        print(f"\n⚠️ Session {r['session']} raised: {r['errors']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1, default=str)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
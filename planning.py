@@ -0,0 +1,80 @@
+import pandas as pd
+import numpy as np
+import heapq
+from scipy.spatial import cKDTree
+from utils import latlon_to_cartesian
+
+# ─── Planificación de nuevos gateways ──────────────────────────────────────────
+#
+# Set cover voraz: los candidatos son puntos sin cobertura (uno por celda de
+# radius_m/4, para no evaluar miles de candidatos casi idénticos) y cada uno
+# cubre los puntos sin cobertura a menos de radius_m (KD-tree sobre coordenadas
+# cartesianas). En cada paso se elige el candidato que cubre más puntos aún no
+# cubiertos; las ganancias se recalculan de forma perezosa y los vecinos de un
+# candidato solo se consultan al sacarlo del montículo (memoria O(n)).
+
+LAT = "Latitude - Functional Location"
+LON = "Longitude - Functional Location"
+
+
+def underserved_mask(df):
+    """Puntos con Gateway = NO o sin dato de cobertura."""
+    gateway = df["Gateway"] if "Gateway" in df.columns else pd.Series(pd.NA, index=df.index)
+    dbm = pd.to_numeric(df["dBm"], errors="coerce") if "dBm" in df.columns else pd.Series(np.nan, index=df.index)
+    return (gateway.eq("NO").fillna(False).astype(bool) | dbm.isna()).to_numpy(dtype=bool)
+
+
+def plan_gateways(df, radius_m=300, max_sites=50):
+    """Propone ubicaciones de gateway que cubran los puntos sin cobertura.
+
+    Devuelve (sites, covered): sites es un DataFrame con lat/lon, nº de puntos que
+    cubre cada sitio e ID point del punto elegido; covered es una máscara sobre df.
+    """
+    lat = pd.to_numeric(df[LAT], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df[LON], errors="coerce").to_numpy(dtype=float)
+    pending = underserved_mask(df) & ~np.isnan(lat) & ~np.isnan(lon)
+    rows = np.flatnonzero(pending)
+    covered = np.zeros(len(df), dtype=bool)
+    columns = ["Latitude", "Longitude", "Covers", "ID point"]
+    if not len(rows):
+        return pd.DataFrame(columns=columns), covered
+
+    coords = latlon_to_cartesian(lat[rows], lon[rows])
+    tree = cKDTree(coords)
+    cells = np.floor(coords / (radius_m / 4)).astype(np.int64)
+    _, cand = np.unique(cells, axis=0, return_index=True)
+    counts = tree.query_ball_point(coords[cand], r=radius_m, return_length=True)
+
+    done = np.zeros(len(rows), dtype=bool)
+    heap = list(zip((-np.asarray(counts)).tolist(), cand.tolist()))
+    heapq.heapify(heap)
+    sites = []
+    while heap and (max_sites is None or len(sites) < max_sites):
+        neg_gain, i = heapq.heappop(heap)
+        nb = np.asarray(tree.query_ball_point(coords[i], r=radius_m), dtype=np.intp)
+        gain = int((~done[nb]).sum())
+        if gain == 0:
+            continue
+        if gain < -neg_gain:
+            heapq.heappush(heap, (-gain, i))  # ganancia desactualizada: reinsertar
+            continue
+        done[nb] = True
+        sites.append((lat[rows[i]], lon[rows[i]], gain,
+                      df["ID point"].iat[rows[i]] if "ID point" in df.columns else rows[i] + 1))
+        if done.all():
+            break
+
+    covered[rows[done]] = True
+    return pd.DataFrame(sites, columns=columns), covered
+
+
+def coverage_summary(df, covered):
+    """Recuento antes/después de añadir los gateways propuestos."""
+    under = underserved_mask(df)
+    served_before = int((~under).sum())
+    return {
+        "total": len(df),
+        "underserved": int(under.sum()),
+        "served_before": served_before,
+        "served_after": served_before + int(covered.sum()),
+    }
@@ -0,0 +1,192 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+import os, json, hashlib, shutil, tempfile
+from utils import safe_filename
+
+# ─── Almacén de proyectos (Parquet por columna) ────────────────────────────────
+#
+# Estructura en disco:
+#   <base_save_path>/projects/<proyecto>/manifest.json
+#   <base_save_path>/projects/<proyecto>/<frame>/<sha1(columna)>.parquet
+#
+# Cada columna se guarda en su propio fichero para que el autoguardado solo
+# reescriba las columnas cuya huella (hash) ha cambiado desde el último guardado.
+
+PROJECTS_DIR = "projects"
+MANIFEST = "manifest.json"
+
+
+def project_dir(base_save_path, name):
+    return os.path.join(base_save_path, PROJECTS_DIR, safe_filename(name, "project"))
+
+
+def project_exists(base_save_path, name):
+    """True si ya hay un proyecto guardado en la carpeta a la que se sanea name."""
+    return os.path.exists(os.path.join(project_dir(base_save_path, name), MANIFEST))
+
+
+def _column_file(column):
+    return hashlib.sha1(str(column).encode("utf-8")).hexdigest() + ".parquet"
+
+
+def _column_fingerprint(s):
+    try:
+        hashed = pd.util.hash_pandas_object(s, index=False).values
+    except TypeError:
+        hashed = pd.util.hash_pandas_object(s.astype(str), index=False).values
+    h = hashlib.sha1(hashed.tobytes())
+    h.update(str(s.dtype).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _replace_atomically(path, write):
+    """write(tmp) sobre un temporal único del mismo directorio y luego os.replace.
+
+    Cada guardado usa su propio temporal, así dos sesiones que guardan el mismo
+    proyecto a la vez no se pisan el fichero intermedio.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _write_column(s, path):
+    """Escribe una columna en Parquet; las columnas object mixtas se guardan como texto."""
+    try:
+        table = pa.Table.from_pandas(s.to_frame(name="v"), preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        text = s.astype(object).where(s.notna(), None).map(lambda v: v if v is None else str(v))
+        table = pa.Table.from_pandas(text.to_frame(name="v"), preserve_index=False)
+    _replace_atomically(path, lambda tmp: pq.write_table(table, tmp))
+
+
+def _read_manifest(pdir):
+    path = os.path.join(pdir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_projects(base_save_path):
+    root = os.path.join(base_save_path, PROJECTS_DIR)
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        d for d in os.listdir(root)
+        if os.path.exists(os.path.join(root, d, MANIFEST))
+    )
+
+
+def save_project(base_save_path, name, frames, meta=None, dirty=None):
+    """Guarda los DataFrames del proyecto; solo reescribe las columnas modificadas.
+
+    frames: {nombre: DataFrame}; None borra el frame y los frames que no se pasan
+    se conservan tal cual en disco. dirty: {nombre: columnas} limita el cálculo
+    de huellas de ese frame a esas columnas (el resto se da por guardado).
+    Si no cambia nada no se reescribe el manifiesto. Devuelve el número de
+    columnas escritas en disco.
+    """
+    pdir = project_dir(base_save_path, name)
+    os.makedirs(pdir, exist_ok=True)
+    old_manifest = _read_manifest(pdir)
+    manifest = old_manifest or {"frames": {}}
+    dirty = dirty or {}
+    written = 0
+
+    new_frames = {}
+    for fname, df in frames.items():
+        if df is None:
+            continue
+        fdir = os.path.join(pdir, fname)
+        os.makedirs(fdir, exist_ok=True)
+        old = manifest["frames"].get(fname, {})
+        old_cols = old.get("columns", {})
+        check = None if fname not in dirty else {str(c) for c in dirty[fname]}
+        if old.get("rows") != len(df):
+            check = None  # filas añadidas/borradas: cambian todas las columnas
+
+        cols = {}
+        for col in df.columns:
+            fpath = os.path.join(fdir, _column_file(col))
+            prev = old_cols.get(str(col))
+            if check is not None and str(col) not in check and prev and os.path.exists(fpath):
+                cols[str(col)] = prev
+                continue
+            s = df[col].reset_index(drop=True)
+            fp = _column_fingerprint(s)
+            if prev and prev["fingerprint"] == fp and os.path.exists(fpath):
+                cols[str(col)] = prev
+                continue
+            _write_column(s, fpath)
+            cols[str(col)] = {"file": _column_file(col), "fingerprint": fp}
+            written += 1
+
+        # Borrar columnas que ya no existen
+        for col, entry in old_cols.items():
+            if col not in cols:
+                try:
+                    os.remove(os.path.join(fdir, entry["file"]))
+                except FileNotFoundError:
+                    pass
+
+        new_frames[fname] = {
+            "order": [str(c) for c in df.columns],
+            "rows": int(len(df)),
+            "columns": cols,
+        }
+
+    for fname, info in manifest["frames"].items():
+        if fname not in frames:
+            new_frames[fname] = info  # no se ha pasado: se mantiene
+        elif fname not in new_frames:
+            shutil.rmtree(os.path.join(pdir, fname), ignore_errors=True)
+
+    if (old_manifest is not None and not written and new_frames == old_manifest["frames"]
+            and (meta or {}) == old_manifest.get("meta")):
+        return 0
+
+    manifest = {
+        "name": str(name),
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+        "meta": meta or {},
+        "frames": new_frames,
+    }
+
+    def _dump(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    _replace_atomically(os.path.join(pdir, MANIFEST), _dump)
+    return written
+
+
+def load_project(base_save_path, name):
+    """Carga un proyecto guardado (lectura memory-mapped). Devuelve (frames, meta)."""
+    pdir = project_dir(base_save_path, name)
+    manifest = _read_manifest(pdir)
+    if manifest is None:
+        raise FileNotFoundError(f"Project '{name}' not found in {pdir}")
+
+    frames = {}
+    for fname, info in manifest["frames"].items():
+        data = {}
+        for col in info["order"]:
+            entry = info["columns"][col]
+            table = pq.read_table(os.path.join(pdir, fname, entry["file"]), memory_map=True)
+            data[col] = table.column(0).to_pandas()
+        frames[fname] = pd.DataFrame(data, columns=info["order"])
+
+    meta = dict(manifest.get("meta", {}))
+    meta["saved_at"] = manifest.get("saved_at")
+    return frames, meta
@@ -0,0 +1,204 @@
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from zipfile import ZipFile, ZIP_DEFLATED
+import io, os, multiprocessing, tempfile
+from signals import signal_config, band_index, signal_colors
+from utils import unique_filenames
+
+# ─── Informes DOCX (individual y por comuna) ───────────────────────────────────
+#
+# Sin dependencias de streamlit: el modo por lotes renderiza mapa y documento
+# de cada comuna en un proceso del pool.
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+REPORT_TEMPLATE = "report_template.docx"
+
+LAT = "Latitude - Functional Location"
+LON = "Longitude - Functional Location"
+
+
+def save_geoposition_map(df, path="map_contextual.png", signal=None):
+    """Mapa de puntos coloreados por banda de dBm sobre OpenStreetMap; path puede ser un buffer."""
+    import contextily as ctx
+
+    signal = signal or signal_config()
+    in_band = band_index(df["dBm"], signal[0]) >= 0
+    fig, ax = plt.subplots(figsize=(12, 8))
+    df_with = df[in_band]
+    df_without = df[~in_band]
+
+    if not df_without.empty:
+        ax.scatter(
+            df_without[LON],
+            df_without[LAT],
+            color=signal[1].color, s=50, alpha=0.9, edgecolors="black"
+        )
+    if not df_with.empty:
+        colors = signal_colors(df_with["dBm"], signal).tolist()
+        ax.scatter(
+            df_with[LON],
+            df_with[LAT],
+            color=colors, s=60, alpha=0.9, edgecolors="black"
+        )
+
+    valid_df = df.dropna(subset=[LAT, LON])
+    if valid_df.empty:
+        plt.close(fig)
+        return False
+    lat_min, lat_max = valid_df[LAT].min(), valid_df[LAT].max()
+    lon_min, lon_max = valid_df[LON].min(), valid_df[LON].max()
+    lat_center = (lat_max + lat_min) / 2
+    lon_center = (lon_max + lon_min) / 2
+    delta = max((lat_max - lat_min) / 2, (lon_max - lon_min) / 2) + 0.05
+    ax.set_xlim(lon_center - delta, lon_center + delta)
+    ax.set_ylim(lat_center - delta, lat_center + delta)
+
+    ctx.add_basemap(ax, crs="EPSG:4326", source=ctx.providers.OpenStreetMap.Mapnik)
+    ax.axis("off")
+    plt.tight_layout()
+    plt.savefig(path, bbox_inches="tight", pad_inches=0)
+    plt.close(fig)
+    return True
+
+
+def report_frame(edited_df):
+    """Datos del informe a partir de la tabla editada (Parent/Child = localizaciones)."""
+    cols = [LAT, LON, "dBm", "Gateway",
+            "Service Address - Functional Location", "Summary - Work Order"]
+    df = edited_df[[c for c in cols if c in edited_df.columns]].copy()
+    if "dBm" in df.columns:
+        df["dBm"] = pd.to_numeric(df["dBm"], errors="coerce")
+    else:
+        df["dBm"] = float("nan")
+    df["Parent"] = edited_df.get("Name - Parent Functional Location", "")
+    df["Child"] = edited_df.get("Name - Child Functional Location", "")
+    return df
+
+
+def _count_axes(df, keys, commune=None):
+    grouped = df.groupby(keys).size().reset_index(name="nb")
+    axe = grouped[keys[-1]]
+    out = pd.DataFrame({
+        "commune": grouped[keys[0]] if commune is None else commune,
+        "axe": axe,
+        "nom_axe": axe.astype(str),
+        "nb": grouped["nb"].astype(int),
+    })
+    return out.to_dict("records")
+
+
+def build_axes(df):
+    """Filas de la tabla 'axes' del informe (groupby vectorizado)."""
+    if "Parent" not in df.columns or "Child" not in df.columns:
+        return None
+
+    # Si Parent/Child están vacíos, usar Service Address o Summary como fallback
+    if df["Parent"].replace("", pd.NA).isna().all() and df["Child"].replace("", pd.NA).isna().all():
+        for col in ("Service Address - Functional Location", "Summary - Work Order"):
+            if col in df.columns:
+                return _count_axes(df, [col], commune="")
+        return []
+    return _count_axes(df, ["Parent", "Child"])
+
+
+def report_context(meta, axes, total):
+    return {
+        "date": meta["date"],
+        "region_departement": meta["region_departement"],
+        "point_focal": meta["point_focal"],
+        "rep_aner": meta["rep_aner"],
+        "rep_salvi": meta["rep_salvi"],
+        "total_commune": total,
+        "total_affectes": meta["total_affectes"],
+        "surplus": meta["surplus"],
+        "observations": meta["observations"],
+        "axes": axes,
+        "nom_prefet": meta["nom_prefet"],
+        "date_prefet": meta["date_prefet"],
+        "date_aner": meta["date_aner"],
+        "date_salvi": meta["date_salvi"],
+    }
+
+
+def render_report_docx(context, template_path=REPORT_TEMPLATE):
+    from docxtpl import DocxTemplate
+
+    doc = DocxTemplate(template_path)
+    doc.render(context)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+# ─── Lote: un informe por comuna ───────────────────────────────────────────────
+
+def _commune_report(args):
+    commune, part, meta, template_path, with_map, signal = args
+    meta = dict(meta, region_departement=commune)
+    docx = render_report_docx(report_context(meta, build_axes(part) or [], len(part)), template_path)
+    png = None
+    if with_map:
+        buf = io.BytesIO()
+        try:
+            if save_geoposition_map(part, buf, signal):
+                png = buf.getvalue()
+        except Exception:
+            png = None  # sin teselas (p.ej. sin red): el informe se entrega igualmente
+    return commune, docx, png
+
+
+def commune_keys(df):
+    """Comuna de cada fila ('Parent'; 'Unassigned' si está vacía)."""
+    return df["Parent"].fillna("").astype(str).str.strip().replace("", "Unassigned")
+
+
+def generate_commune_reports_zip(df, meta, template_path=REPORT_TEMPLATE,
+                                 with_map=True, max_workers=None, signal=None, spool_mb=32):
+    """Un DOCX (+ mapa PNG) por comuna (commune_keys), generados en paralelo en un ZIP.
+
+    Solo se mantienen en vuelo 2×workers comunas a la vez y el ZIP se escribe en
+    un fichero temporal que pasa a disco por encima de spool_mb, así que durante
+    la generación solo hay en memoria los resultados en vuelo. Devuelve (fichero
+    del ZIP abierto y rebobinado, {comuna: nº de puntos}); quien llama debe
+    cerrarlo. st.download_button necesita los bytes: al descargar, el ZIP
+    completo vuelve a estar en memoria.
+    """
+    keys = commune_keys(df)
+    groups = keys.groupby(keys.to_numpy(), sort=True).indices
+    counts = {k: len(pos) for k, pos in groups.items()}
+    names = unique_filenames(counts)
+    signal = signal or signal_config()
+    pending_jobs = (
+        (k, df.iloc[pos], meta, template_path, with_map, signal) for k, pos in groups.items()
+    )
+
+    out = tempfile.SpooledTemporaryFile(max_size=spool_mb * 1024 * 1024)
+    workers = min(max_workers or os.cpu_count() or 1, max(len(groups), 1))
+
+    def _store(zf, result):
+        commune, docx, png = result
+        name = names[commune]
+        zf.writestr(f"{name}/report_{name}.docx", docx)
+        if png is not None:
+            zf.writestr(f"{name}/map_{name}.png", png)
+
+    with ZipFile(out, "w", ZIP_DEFLATED) as zf:
+        if workers <= 1:
+            for job in pending_jobs:
+                _store(zf, _commune_report(job))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                in_flight = set()
+                for job in pending_jobs:
+                    in_flight.add(pool.submit(_commune_report, job))
+                    if len(in_flight) >= 2 * workers:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            _store(zf, fut.result())
+                for fut in wait(in_flight).done:
+                    _store(zf, fut.result())
+    out.seek(0)
+    return out, counts
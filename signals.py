@@ -0,0 +1,45 @@
+import pandas as pd
+import numpy as np
+
+# ─── Clasificación de señal (dBm) ──────────────────────────────────────────────
+#
+# Bandas, etiquetas, colores y veredicto de Gateway salen de [SIGNAL_BANDS] en
+# config.ini. Toda la clasificación es vectorizada (np.select sobre el array de
+# dBm) y la usan la ingesta, el editor, el mapa y los informes.
+
+
+def signal_config(config=None):
+    """(bandas, banda sin dato) de la configuración dada o de config.ini."""
+    if config is None:
+        from config_loader import load_config
+        config = load_config()
+    return config.signal_bands, config.signal_no_data
+
+
+def band_index(values, bands):
+    """Índice de la primera banda que contiene cada valor; -1 si no hay dato o ninguna encaja."""
+    v = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    conds = [(v >= b.min_dbm) & (v <= b.max_dbm) for b in bands]
+    return np.select(conds, np.arange(len(bands)), default=-1) if bands else np.full(len(v), -1)
+
+
+def _lookup(values, signal, attr):
+    bands, no_data = signal
+    # La banda sin dato va al final: el índice -1 la selecciona directamente
+    table = np.array([getattr(b, attr) for b in bands] + [getattr(no_data, attr)], dtype=object)
+    out = table[band_index(values, bands)]
+    index = values.index if isinstance(values, pd.Series) else None
+    return pd.Series(out, index=index, dtype=object)
+
+
+def signal_labels(values, signal):
+    return _lookup(values, signal, "label")
+
+
+def signal_colors(values, signal):
+    return _lookup(values, signal, "color")
+
+
+def gateway_verdict(values, signal):
+    """YES/NO según la banda; None sin dato (columna 'Gateway')."""
+    return _lookup(values, signal, "gateway")
@@ -0,0 +1,42 @@
+"""Comprobación rápida: importa todos los módulos y carga config.ini.
+
+Detecta errores que compileall no ve (p.ej. definiciones de dataclass que solo
+fallan al importar en ciertas versiones de Python).
+
+Uso:
+    python smoke_check.py
+"""
+import importlib
+import sys
+
+MODULES = [
+    "config_loader", "utils", "signals", "validation", "jobs", "ingest_cache",
+    "project_store", "editor_window", "editor_utils", "export_utils", "planning",
+    "reports", "file_processing", "visualizations", "loadtest",
+]
+
+
+def main():
+    failed = []
+    for name in MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            failed.append(f"{name}: {type(e).__name__}: {e}")
+
+    try:
+        from config_loader import load_config
+        config = load_config()
+        print(f"config.ini: {len(config.signal_bands)} signal bands, "
+              f"{len(config.required_columns)} required columns")
+    except Exception as e:
+        failed.append(f"load_config: {type(e).__name__}: {e}")
+
+    for msg in failed:
+        print(f"❌ {msg}")
+    print("✅ Smoke check passed" if not failed else f"{len(failed)} failures")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,31 @@
-import pandas as pd
-
-def classify_signal(v):
-    if pd.isna(v):
-        return None
-    if -70 <= v <= -10:
-        return "YES"
-    if -200 <= v < -70:
-        return "NO"
-    return None
+import numpy as np
+import re
+
+def latlon_to_cartesian(lat, lon):
+    R = 6371000
+    phi = np.radians(lat)
+    theta = np.radians(lon)
+    x = R * np.cos(phi) * np.cos(theta)
+    y = R * np.cos(phi) * np.sin(theta)
+    z = R * np.sin(phi)
+    return np.vstack((x, y, z)).T
+
+
+def safe_filename(value, default="Unassigned"):
+    """Nombre de fichero/carpeta válido a partir de un valor libre."""
+    return re.sub(r"[^\w\-. ]", "_", str(value)).strip() or default
+
+
+def unique_filenames(values, default="Unassigned"):
+    """{valor: nombre seguro}; si dos valores dan el mismo nombre se añade _n."""
+    names, used = {}, set()
+    for value in values:
+        base = safe_filename(value, default)
+        name, n = base, 1
+        # Sin distinguir mayúsculas: al extraer en Windows/macOS también colisionan
+        while name.lower() in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name.lower())
+        names[value] = name
+    return names
@@ -0,0 +1,176 @@
+import pandas as pd
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, List
+
+# ─── Motor de validación vectorizado ───────────────────────────────────────────
+#
+# Las reglas se declaran en la sección [VALIDATION] de config.ini y producen una
+# máscara de errores por celda (True = valor no válido). Cada regla marca una
+# única columna destino; tras una edición solo se recalculan las columnas destino
+# cuyas reglas leen alguna columna modificada, y solo en las filas modificadas.
+
+DATETIME_FORMATS = ["%d/%m/%Y %I:%M %p", "%I:%M %p"]
+
+
+@dataclass
+class Rule:
+    name: str
+    inputs: List[str]
+    target: str
+    check: Callable[[pd.DataFrame], pd.Series]
+
+
+def is_empty(s):
+    return s.isna() | s.astype(str).str.strip().eq("")
+
+
+def parse_times(s):
+    """Convierte los textos de fecha/hora del editor; NaT si no encaja ningún formato."""
+    s = s.where(~is_empty(s))
+    out = pd.to_datetime(s, format=DATETIME_FORMATS[0], errors="coerce")
+    for fmt in DATETIME_FORMATS[1:]:
+        missing = out.isna() & s.notna()
+        if missing.any():
+            out[missing] = pd.to_datetime(s[missing], format=fmt, errors="coerce")
+    return out
+
+
+def _split_list(raw, sep=";"):
+    return [x.strip() for x in raw.split(sep) if x.strip()]
+
+
+def _yes(raw):
+    return str(raw).strip().lower() in ("1", "yes", "true", "on")
+
+
+def missing_required(df, columns):
+    """Columnas requeridas con algún valor vacío."""
+    return [c for c in columns if c in df.columns and is_empty(df[c]).any()]
+
+
+# ─── Construcción de reglas desde la configuración ─────────────────────────────
+
+def compile_rules(config):
+    spec = config.validation
+    rules = []
+
+    if _yes(spec.get("required", "yes")):
+        for col in config.required_columns:
+            rules.append(Rule("required", [col], col, lambda d, c=col: is_empty(d[c])))
+
+    if _yes(spec.get("allowed_values", "yes")):
+        for col, allowed in config.dropdown_values.items():
+            rules.append(Rule(
+                "allowed_values", [col], col,
+                lambda d, c=col, a=allowed: ~is_empty(d[c]) & ~d[c].astype(str).str.strip().isin(a),
+            ))
+
+    for pair in _split_list(spec.get("parent_child", "")):
+        parent, child = [x.strip() for x in pair.split(">", 1)]
+        valid = [f"{p}\x1f{c}" for p, cs in config.parent_child_map.items() for c in cs]
+
+        def check(d, p=parent, c=child, v=valid):
+            key = d[p].astype(str).str.strip() + "\x1f" + d[c].astype(str).str.strip()
+            return ~is_empty(d[c]) & ~key.isin(v)
+
+        rules.append(Rule("parent_child", [parent, child], child, check))
+
+    for pair in _split_list(spec.get("time_order", "")):
+        start, end = [x.strip() for x in pair.split("<", 1)]
+        for col in (start, end):
+            rules.append(Rule(
+                "time_format", [col], col,
+                lambda d, c=col: ~is_empty(d[c]) & parse_times(d[c]).isna(),
+            ))
+
+        def check(d, a=start, b=end):
+            ta, tb = parse_times(d[a]), parse_times(d[b])
+            return (ta.notna() & tb.notna() & (tb <= ta)).astype(bool)
+
+        rules.append(Rule("time_order", [start, end], end, check))
+
+    for item in _split_list(spec.get("ranges", "")):
+        col, bounds = [x.strip() for x in item.rsplit(":", 1)]
+        lo, hi = [float(x) for x in bounds.split("..", 1)]
+
+        def check(d, c=col, lo=lo, hi=hi):
+            v = pd.to_numeric(d[c], errors="coerce")
+            return ~is_empty(d[c]) & ~v.between(lo, hi)
+
+        rules.append(Rule("range", [col], col, check))
+
+    return rules
+
+
+# ─── Evaluación completa e incremental ─────────────────────────────────────────
+
+def _applicable(rules, df):
+    return [r for r in rules if all(c in df.columns for c in r.inputs)]
+
+
+def _evaluate(rules, df, target):
+    err = np.zeros(len(df), dtype=bool)
+    for r in rules:
+        if r.target == target:
+            err |= r.check(df).fillna(False).to_numpy(dtype=bool)
+    return err
+
+
+def validate(df, rules):
+    """Máscara de errores completa (filas de df × columnas destino)."""
+    rules = _applicable(rules, df)
+    targets = list(dict.fromkeys(r.target for r in rules))
+    return pd.DataFrame(
+        {t: _evaluate(rules, df, t) for t in targets},
+        index=df.index,
+        columns=targets,
+    )
+
+
+def revalidate(errors, df, rules, changes):
+    """Actualiza errors solo para las celdas afectadas por changes ({columna: etiquetas})."""
+    if errors is None or changes is None or not errors.index.equals(df.index):
+        return validate(df, rules)
+
+    rules = _applicable(rules, df)
+    touched = {}
+    for r in rules:
+        for col in r.inputs:
+            if col in changes:
+                touched.setdefault(r.target, []).append(changes[col])
+
+    for target, label_sets in touched.items():
+        labels = pd.Index(np.concatenate([np.asarray(l) for l in label_sets])).unique()
+        if not len(labels):
+            continue
+        sub = df.loc[labels]
+        errors.loc[labels, target] = _evaluate(rules, sub, target)
+    return errors
+
+
+def changed_cells(before, after, columns):
+    """{columna: etiquetas de fila} con los valores que difieren entre before y after."""
+    if before is None or not before.index.equals(after.index):
+        return None
+    changes = {}
+    for col in columns:
+        if col not in before.columns or col not in after.columns:
+            continue
+        a, b = before[col], after[col]
+        diff = ~(a.eq(b) | (a.isna() & b.isna()))
+        if diff.any():
+            changes[col] = after.index[diff.to_numpy()]
+    return changes
+
+
+def row_issues(errors, labels, names=None):
+    """Texto con las columnas no válidas de cada fila (para mostrar en el editor)."""
+    names = names or {}
+    sub = errors.reindex(labels).fillna(False).astype(bool)
+    if sub.empty or not len(sub.columns):
+        return pd.Series("", index=labels)
+    out = pd.Series("", index=labels, dtype=object)
+    for col in sub.columns:
+        out = out + np.where(sub[col].to_numpy(), names.get(col, col) + ", ", "")
+    return out.str.rstrip(", ")
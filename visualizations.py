@@ -1,16 +1,24 @@
 import folium
-from folium.plugins import MarkerCluster
+from folium.plugins import MarkerCluster, Draw
 from streamlit_folium import st_folium
-import pandas as pd
+import numpy as np
 import streamlit as st
+from editor_utils import PointIndex, ids_in_drawings
+from signals import signal_config, signal_colors
 
-def render_map():
+def render_map(gateway_plan=None, config=None):
+    """Mapa de puntos; gateway_plan = {"sites": DataFrame, "radius_m": int} añade la capa de propuestas."""
     if "latest_edited" not in st.session_state or st.session_state.latest_edited.empty:
         return
 
-    df = st.session_state.latest_edited.copy()
-    df = df.dropna(subset=["Latitude - Functional Location", "Longitude - Functional Location"]).reset_index(drop=True)
+    # Solo las columnas que usa el mapa (sin copiar la tabla completa)
+    src = st.session_state.latest_edited
+    cols = [c for c in ["ID point", "Latitude - Functional Location", "Longitude - Functional Location", "dBm"]
+            if c in src.columns]
+    df = src[cols].dropna(subset=["Latitude - Functional Location", "Longitude - Functional Location"]).reset_index(drop=True)
     df["row_id"] = df.index
+    signal = signal_config(config)
+    df["color"] = signal_colors(df["dBm"], signal) if "dBm" in df.columns else signal[1].color
 
     if "ID point" in df.columns:
         df["row_id"] = df["ID point"] - 1
@@ -56,16 +64,6 @@ def render_map():
     else:
         cluster = MarkerCluster().add_to(m)
 
-    def color_from_dbm(dBm):
-        if pd.isna(dBm):
-            return "lightgray"
-        if dBm >= -69:
-            return "green"
-        elif -80 <= dBm < -69:
-            return "orange"
-        else:
-            return "red"
-
     offsets = [
         "transform: translate(12px, 0);",
         "transform: translate(-22px, 0);",
@@ -73,13 +71,15 @@ def render_map():
         "transform: translate(0, 12px);"
     ]
 
-    for _, row in df.iterrows():
-        lat = row["Latitude - Functional Location"]
-        lon = row["Longitude - Functional Location"]
-        dbm = row.get("dBm", None)
-        row_id = row["row_id"]
-        point_id = row.get("ID point", row_id)
-
+    points = zip(
+        df["Latitude - Functional Location"].to_numpy(),
+        df["Longitude - Functional Location"].to_numpy(),
+        df["dBm"].to_numpy() if "dBm" in df.columns else [None] * len(df),
+        df["row_id"].to_numpy(),
+        (df["ID point"] if "ID point" in df.columns else df["row_id"]).to_numpy(),
+        df["color"].to_numpy(),
+    )
+    for lat, lon, dbm, row_id, point_id, color in points:
         style = offsets[row_id % len(offsets)]
 
         folium.Marker(
@@ -101,13 +101,54 @@ def render_map():
             radius=6,
             color="black",
             fill=True,
-            fill_color=color_from_dbm(dbm),
+            fill_color=color,
             fill_opacity=0.9,
             popup=f"ID point: {point_id} | dBm: {dbm}",
         ).add_to(m)
 
+    # --- Capa de gateways propuestos por el planificador ---
+    if gateway_plan is not None and not gateway_plan["sites"].empty:
+        layer = folium.FeatureGroup(name="📡 Proposed gateways", show=True).add_to(m)
+        for _, site in gateway_plan["sites"].iterrows():
+            folium.Circle(
+                location=[site["Latitude"], site["Longitude"]],
+                radius=gateway_plan["radius_m"],
+                color="#1f6feb", weight=1, fill=True, fill_opacity=0.08,
+            ).add_to(layer)
+            folium.Marker(
+                location=[site["Latitude"], site["Longitude"]],
+                icon=folium.Icon(color="blue", icon="signal"),
+                tooltip=f"Proposed gateway · covers {site['Covers']} points (near ID {site['ID point']})",
+            ).add_to(layer)
+        folium.LayerControl(collapsed=True).add_to(m)
+
+    # --- Selección por lazo/rectángulo para la edición masiva ---
+    Draw(
+        export=False,
+        draw_options={
+            "polyline": False, "circle": False, "marker": False,
+            "circlemarker": False, "polygon": True, "rectangle": True,
+        },
+        edit_options={"edit": False},
+    ).add_to(m)
+
     map_data = st_folium(m, height=800, use_container_width=True)
 
+    drawings = (map_data or {}).get("all_drawings") or []
+    if drawings and "ID point" in df.columns:
+        idx = st.session_state.get("point_index")
+        if idx is None or not idx.matches(df):
+            idx = PointIndex(df)
+            st.session_state.point_index = idx
+        selected = ids_in_drawings(idx, drawings)
+        if not np.array_equal(selected, st.session_state.get("map_selection_ids", np.array([]))):
+            st.session_state.map_selection_ids = selected
+            st.rerun()
+        st.caption(f"🔲 {len(selected)} points selected on the map")
+    elif len(st.session_state.get("map_selection_ids", [])):
+        st.session_state.map_selection_ids = np.array([])
+        st.rerun()
+
     if map_data and map_data.get("last_clicked"):
         clicked = map_data["last_clicked"]
         lat, lon = clicked["lat"], clicked["lng"]